@@ -0,0 +1,199 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import shutil
+import threading
+import tempfile
+import numpy as np
+
+# Make the shared modules in software/common and the aggregator in software/Formatting importable
+DEVTOOLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SOFTWARE_DIR = os.path.join(DEVTOOLS_DIR, "..", "software")
+sys.path.insert(0, SOFTWARE_DIR)
+sys.path.insert(0, os.path.join(SOFTWARE_DIR, "Formatting"))
+from common.frames import FrameAssembler
+from common.mqtt_client import encode_payload
+from common.nodes import load_registry, Node, NodeRegistry, NODE_CONFIG_ENV
+from common.vibration import StreamingHighPass, VibrationFeatures
+from common.waveforms import WaveformArchive
+
+# Recorded readings replayed for each node by default
+DATA_DIR = os.path.join(DEVTOOLS_DIR, "publish-test-data")
+DEFAULT_CORPORA = {
+    "PL": "photolithography.txt",
+    "SC": "spin_coating.txt",
+    "SP": "sputtering.txt",
+}
+
+# Timed stages, each excluding the stages it calls: decode is decode_and_archive without the
+# archive append, magnitude is process_acceleration without the filter and the features, and
+# assemble is the frame update without encoding the frame it completed
+STAGES = ("parse", "decode", "archive", "filter", "magnitude", "features", "assemble", "encode")
+
+
+# Read a recorded corpus, keeping only lines that are JSON readings
+def load_corpus(path):
+    lines = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            try:
+                if line and isinstance(json.loads(line), dict):
+                    lines.append(line)
+            except ValueError:
+                continue
+    if not lines:
+        raise ValueError(f"No readings found in {path}")
+    return lines
+
+
+# Every node of the registry `replicas` times (under new names when replicas > 1),
+# with the name of the recorded node each copy replays
+def replicate(registry, replicas):
+    if replicas == 1:
+        return registry, {node.key: node.name for node in registry}
+    nodes = []
+    sources = {}
+    for replica in range(replicas):
+        for node in registry:
+            copy = Node(f"{node.name}{replica}", node.sensors, registry.sensors,
+                        vibration_encoding=node.vibration_encoding)
+            nodes.append(copy)
+            sources[copy.key] = node.name
+    return NodeRegistry(registry.sensors, nodes, registry.gui), sources
+
+
+def run_pipeline(aggregator, registry, corpora, frames_per_node, replicas):
+    """Replay the corpora through the aggregator's own handlers and time each stage.
+
+    The aggregator module is pointed at the simulated nodes, a frame assembler
+    that encodes frames instead of publishing them and a waveform archive in a
+    temporary directory. Readings go through handle_reading and
+    handle_vibration_reading, so vibration buffers take the same worker pool
+    hop as in production, and each round of readings is finished before the
+    next is sent. Returns (per-stage exclusive timings in ns, messages
+    processed, frames emitted, elapsed seconds, CPU seconds).
+    """
+    simulated, sources = replicate(registry, replicas)
+    timings = {stage: [] for stage in STAGES}
+    clock = time.perf_counter_ns
+    # Per thread, the time spent in timed calls nested in each timed call in progress
+    nesting = threading.local()
+
+    # Worker threads append to these lists, list.append is atomic
+    def timed(stage, fn):
+        def wrapper(*args, **kwargs):
+            stack = nesting.__dict__.setdefault("stack", [])
+            stack.append(0)
+            t0 = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                total = clock() - t0
+                timings[stage].append(total - stack.pop())
+                if stack:
+                    stack[-1] += total
+        return wrapper
+
+    frames = []
+    archive_dir = tempfile.mkdtemp(prefix="waveforms-")
+    archive = WaveformArchive(archive_dir, codec=aggregator.WAVEFORM_CODEC)
+    archive.append = timed("archive", archive.append)
+    encode = timed("encode", lambda frame: frames.append(encode_payload(frame)))
+    assembler = FrameAssembler(simulated.frame_schema(), encode, deadline=float("inf"))
+    assembler.update = timed("assemble", assembler.update)
+
+    aggregator.nodes = simulated
+    aggregator.vibration_filters = {node.key: StreamingHighPass() for node in simulated if node.has_vibration}
+    for vibration_filter in aggregator.vibration_filters.values():
+        vibration_filter.process = timed("filter", vibration_filter.process)
+    aggregator.vibration_features = VibrationFeatures()
+    aggregator.vibration_features.compute = timed("features", aggregator.vibration_features.compute)
+    aggregator.waveform_archive = archive
+    aggregator.frames = assembler
+    for name, stage in (("parse_reading", "parse"), ("decode_and_archive", "decode"),
+                        ("process_acceleration", "magnitude")):
+        setattr(aggregator, name, timed(stage, getattr(aggregator, name)))
+
+    handlers = [(node.key, aggregator.handle_vibration_reading if node.has_vibration else aggregator.handle_reading,
+                 corpora[sources[node.key]]) for node in simulated]
+
+    vibration_keys = [node.key for node in simulated if node.has_vibration]
+    messages = 0
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        for i in range(frames_per_node):
+            for key, handler, corpus in handlers:
+                handler(key, corpus[i % len(corpus)])
+                messages += 1
+            # Let the workers finish the round, as they would between readings at the nodes' real rate,
+            # so the rounds are assembled into frames one at a time
+            for key in vibration_keys:
+                aggregator.vibration_pool.submit(key, lambda: None).result()
+        aggregator.vibration_pool.shutdown(wait=True)
+    finally:
+        archive.close()
+        shutil.rmtree(archive_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    return timings, messages, len(frames), elapsed, cpu
+
+def print_report(timings, messages, frames, elapsed, cpu, rate):
+    # Vibration buffers are processed on worker threads, so capacity is estimated from CPU time
+    per_message = cpu / messages
+    print(f"Processed {messages} messages ({frames} frames) in {elapsed:.2f} s, {cpu:.2f} s of CPU")
+    print(f"  {messages / elapsed:,.0f} messages/s, {frames / elapsed:,.1f} frames/s, "
+          f"{per_message * 1e6:,.0f} us of CPU per message")
+    print()
+    print(f"{'stage':<10}{'count':>8}{'p50 (us)':>12}{'p99 (us)':>12}")
+    for stage in STAGES:
+        samples = np.array(timings[stage]) / 1000
+        if samples.size == 0:
+            print(f"{stage:<10}{0:>8}{'-':>12}{'-':>12}")
+            continue
+        p50, p99 = np.percentile(samples, [50, 99])
+        print(f"{stage:<10}{samples.size:>8}{p50:>12.1f}{p99:>12.1f}")
+    print()
+    print(f"At {rate:g} message(s) per node per second, one core handles about "
+          f"{1 / (per_message * rate):,.0f} nodes with this node mix.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the aggregator pipeline in-process on recorded readings.")
+    parser.add_argument('--frames', type=int, default=1000,
+                        help="Readings replayed per simulated node. Default is 1000.")
+    parser.add_argument('--replicas', type=int, default=1,
+                        help="Copies of every configured node to simulate. Default is 1.")
+    parser.add_argument('--corpus', action='append', default=[], metavar="NODE=FILE",
+                        help="Replay FILE for NODE instead of its default recording. Can be repeated.")
+    parser.add_argument('--nodes', type=str, default=None,
+                        help="Node config to use instead of software/nodes.json.")
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help="Messages each node sends per second, for the capacity estimate. Default is 1.")
+    args = parser.parse_args()
+
+    # The aggregator loads the node config when it is imported
+    if args.nodes:
+        os.environ[NODE_CONFIG_ENV] = args.nodes
+    aggregator = importlib.import_module("aggregator2")
+    registry = load_registry(args.nodes)
+    corpus_files = {name: os.path.join(DATA_DIR, file) for name, file in DEFAULT_CORPORA.items()}
+    for entry in args.corpus:
+        name, _, path = entry.partition("=")
+        corpus_files[name] = path
+
+    corpora = {}
+    for node in registry:
+        if node.name not in corpus_files:
+            parser.error(f"No recording for node {node.name}, pass --corpus {node.name}=FILE")
+        corpora[node.name] = load_corpus(corpus_files[node.name])
+
+    print_report(*run_pipeline(aggregator, registry, corpora, args.frames, args.replicas), args.rate)
+
+
+if __name__ == "__main__":
+    main()
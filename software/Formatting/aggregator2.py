@@ -1,87 +1,65 @@
-import subprocess
+import os
+import sys
 import json
 import time
-from datetime import datetime
-from threading import Thread, Lock
+import atexit
+from functools import partial
 import numpy as np
-import scipy.signal as signal
-import re
+
+# Make the shared modules in software/common importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.frames import FrameAssembler
+from common.mqtt_client import MQTTPublisher, MQTTSubscriber
+from common.nodes import load_registry
+from common.vibration import hex_to_bytes, decode_counts, compact_to_bytes, is_error_buffer, StreamingHighPass, VibrationFeatures, COUNTS_PER_G
+from common.waveforms import WaveformArchive, ZLIB
+from common.workers import KeyedExecutor
 
 # MQTT configuration
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1337
 MQTT_USERNAME = "hackerfab2025"
 MQTT_PASSWORD = "osu2025"
+INPUT_TOPIC = "topic/+"  # Every node publishes to topic/<node>
+
+# Seconds to wait for slow nodes before publishing a partial frame
+FRAME_DEADLINE = 3.0
 
 # Local testing configuration
 #MQTT_BROKER = "test.mosquitto.org"
 #MQTT_PORT = 1883
 
-# Dictionary to store data for three nodes
-PL_data = {"temperature": None, "humidity": None, "ambient_light":None, "vibration":None}
-SC_data = {"temperature":None, "humidity":None, "particle_count":None, "vibration":None}
-SP_data = {"temperature":None, "humidity": None, "ambient_light":None}
-data = {"PL_data": PL_data, "SC_data": SC_data, "SP_data": SP_data, "time": None}
+# Nodes and the fields each one reports come from the node config (software/nodes.json)
+nodes = load_registry()
+
+# Vibration nodes also publish their full feature set next to the single vibration value
+FRAME_SCHEMA = nodes.frame_schema()
+
+# High-pass filter per node, carrying filter state across that node's buffers
+vibration_filters = {node.key: StreamingHighPass() for node in nodes if node.has_vibration}
 
-# Lock to ensure thread-safe updates to the data dictionary
-data_lock = Lock()
+# RMS, peak, crest factor, dominant frequency and band energies of each filtered buffer
+vibration_features = VibrationFeatures()
+
+# Every decoded ADXL buffer is kept as compressed count deltas, read it back with common.waveforms.WaveformReader
+WAVEFORM_DIR = "waveforms"
+WAVEFORM_CODEC = ZLIB
+WAVEFORM_RETENTION = 30 * 24 * 60 * 60
+waveform_archive = WaveformArchive(WAVEFORM_DIR, codec=WAVEFORM_CODEC, retention=WAVEFORM_RETENTION)
+
+# Worker pool for vibration processing, each node always runs on the same worker
+vibration_pool = KeyedExecutor(name="vibration")
+
+# Single long-lived connection shared by all listener threads
+publisher = MQTTPublisher(MQTT_BROKER, MQTT_PORT, MQTT_USERNAME, MQTT_PASSWORD, client_id="aggregator")
 
 # Publish data over MQTT
 def publish_to_mqtt(message):
     """Publish the message to the specified MQTT topic."""
-    command = [
-        "mosquitto_pub",
-        "-h", MQTT_BROKER,
-        "-p", str(MQTT_PORT),
-        "-u", MQTT_USERNAME,
-        "-P", MQTT_PASSWORD,
-        "-t", "reading/formatted",
-        "-m", json.dumps(message)  # Publish as a JSON string
-    ]
-    subprocess.run(command)
-
-# Remove any null characters from hex string
-# Used for processing acceleration data
-def parse_hex_string(hex_string):
-    hex_string = re.sub(r'[^0-9A-Fa-f]', '', hex_string)
-    return [int(hex_string[i:i+2], 16) for i in range(0, len(hex_string), 2)]
+    publisher.publish("reading/formatted", message)  # Publish as a JSON string
 
-# Determine sign of readings
-# Used for processing acceleration data
-def convert_to_signed_20bit(value):
-    if value & 0x80000:
-        value -= 0x100000
-    return value
-
-# Convert readings from hex to decimal
-# Used for processing acceleration data
-def decode_sensor_readings(read_buffer):
-    num_readings = len(read_buffer) // 9
-    accel_data = []
-    
-    for i in range(num_readings):
-        start = i * 9
-        x_data = (read_buffer[start] << 12) | (read_buffer[start + 1] << 4) | (read_buffer[start + 2] >> 4)
-        y_data = (read_buffer[start + 3] << 12) | (read_buffer[start + 4] << 4) | (read_buffer[start + 5] >> 4)
-        z_data = (read_buffer[start + 6] << 12) | (read_buffer[start + 7] << 4) | (read_buffer[start + 8] >> 4)
-        
-        x_data = convert_to_signed_20bit(x_data)
-        y_data = convert_to_signed_20bit(y_data)
-        z_data = convert_to_signed_20bit(z_data)
-        
-        accel_x = (x_data / 64000)
-        accel_y = (y_data / 64000)
-        accel_z = (z_data / 64000)
-        
-        accel_data.append([accel_x, accel_y, accel_z])
-    
-    return np.array(accel_data)
-
-# Filter out acceleration due to gravity
-# Used for processing acceleration data
-def high_pass_filter(accel_data, cutoff=1, fs=500):
-    b, a = signal.butter(1, cutoff / (fs / 2), btype='high', analog=False)
-    return signal.filtfilt(b, a, accel_data, axis=0)
+# Frames are published once every node has reported or the deadline passes
+frames = FrameAssembler(FRAME_SCHEMA, publish_to_mqtt, deadline=FRAME_DEADLINE)
 
 # Integrate acceleration readings to get displacement
 # Used for processing acceleration data
@@ -90,12 +68,10 @@ def integrate(accel_data, dt=0.002):
     displacement = np.cumsum(velocity * dt, axis=0)
     return velocity, displacement
 
-# Process acceleration data
-def process_acceleration(temp_buffer):
-    # Convert hex string to decimal
-    buffer_bytes = parse_hex_string(temp_buffer)
-    accel_data = decode_sensor_readings(buffer_bytes)
-    filtered_accel = high_pass_filter(accel_data)
+# Process acceleration data, accel_data is the decoded (N, 3) buffer in g
+# Returns the vibration value sent to analysis and the per-axis features of the buffer
+def process_acceleration(accel_data, node):
+    filtered_accel = vibration_filters[node].process(accel_data)  # Filter out acceleration due to gravity
     
     # Find average acceleration in each direction
     accel_x_avg = np.max(filtered_accel[:, 0])  # Average of x-component
@@ -104,99 +80,84 @@ def process_acceleration(temp_buffer):
 
     # Compute net magnitude of acceleration (m/s^2)
     accel_magnitude = np.sqrt(accel_x_avg**2 + accel_y_avg**2 + accel_z_avg**2)
-    return round(accel_magnitude, 2)
-
-# Check for remaining null values in data dictionary
-def check_null(data):
-    for key, value in data.items():
-        if key == "time":  # Skip checking "time"
-            continue
-        if isinstance(value, dict):  # If the value is a dictionary, check its values
-            if any(v is None for v in value.values()):
-                return True
-    return False
-
-# Reset all dictionary values to null
-def set_all_to_null(data):
-    for key, value in data.items():
-        if isinstance(value, dict):
-            for subkey in value:
-                value[subkey] = None
+    return round(accel_magnitude, 2), vibration_features.compute(filtered_accel)
+
+# Decode a raw ADXL buffer into acceleration in g, archiving its counts on the way
+def decode_and_archive(node_key, raw):
+    counts = decode_counts(raw)
+    try:
+        waveform_archive.append(nodes.by_key[node_key].name, time.time(), counts)
+    except Exception as e:
+        print(f"Error archiving vibration buffer for {node_key}: {e}")
+    return counts / COUNTS_PER_G
+
+# Reduce a node's vibration buffer to a single value, runs on the vibration worker pool
+def process_node_reading(node_key, new_data):
+    try:
+        vibration = new_data.get("vibration")
+        if isinstance(vibration, str):
+            if all(char == 'F' for char in vibration): # Check for acceleration error
+                new_data["vibration"], new_data["vibration_features"] = -1, {}
+            else:
+                new_data["vibration"], new_data["vibration_features"] = process_acceleration(decode_and_archive(node_key, hex_to_bytes(vibration)), node_key) # Process acceleration
+        frames.update(node_key, new_data)
+    except Exception as e:
+        print(f"Error processing reading for {node_key}: {e}")
+
+# Reduce a compact (binary or base64) vibration buffer to a single value, runs on the vibration worker pool
+def process_compact_vibration(node_key, encoding, payload):
+    try:
+        raw = compact_to_bytes(payload, encoding)
+        if is_error_buffer(raw): # Check for acceleration error
+            vibration, features = -1, {}
         else:
-            data[key] = None
-
-# Continuously process readings from ESP32 and send to data analysis
-def listen_to_topic(topic, key):
-    while True:
-        print(f"Listening to topic: {topic}")  # Check for MQTT connection on system startup
-        
-        command = [
-            "mosquitto_sub",
-            "-h", MQTT_BROKER,
-            "-p", str(MQTT_PORT),
-            "-u", MQTT_USERNAME,
-            "-P", MQTT_PASSWORD,
-            "-t", topic
-        ]
-
-        try:
-            with subprocess.Popen(command, stdout=subprocess.PIPE, text=True) as proc:
-                # Read in lines over MQTT
-                for line in proc.stdout:
-                    line = line.strip()
-
-                    # Skip empty lines
-                    if not line:
-                        continue 
-
-                    # Check which thread received data and update corresponding embedded dictionary
-                    with data_lock:  # Use the lock to ensure thread safety
-                        if key == "PL_thread":
-                            new_data = json.loads(line)
-                            data["PL_data"] = {key: new_data[key] if key in new_data else data["PL_data"][key] for key in data["PL_data"]}
-                            if all(char == 'F' for char in data["PL_data"]["vibration"]): # Check for acceleration error
-                                data["PL_data"]["vibration"] = -1
-                            else:
-                                data["PL_data"]["vibration"] = process_acceleration(data["PL_data"]["vibration"]) # Process acceleration
-                        elif key == "SC_thread":
-                            new_data = json.loads(line)
-                            data["SC_data"] = {key: new_data[key] if key in new_data else data["SC_data"][key] for key in data["SC_data"]}
-                            if all(char == 'F' for char in data["SC_data"]["vibration"]): # Check for acceleration error
-                                data["SC_data"]["vibration"] = -1
-                            else:
-                                data["SC_data"]["vibration"] = process_acceleration(data["SC_data"]["vibration"]) # Process acceleration
-                        elif key == "SP_thread":
-                            new_data = json.loads(line)
-                            data["SP_data"] = {key: new_data[key] if key in new_data else data["SP_data"][key] for key in data["SP_data"]}
-
-                        # Check if all threads have updated data
-                        if not check_null(data):  
-                            data["time"] = datetime.now().replace(microsecond=0).isoformat()  # Update the timestamp
-                           
-                            # Publish the data to MQTT
-                            publish_to_mqtt(data)
-                                
-                            # Reset data for next reading
-                            set_all_to_null(data)
-
-        except Exception as e:
-            print(f"Error in listening to topic {topic}: {e}")
-
-            # Wait five seconds then try to reconnect
-            time.sleep(5)
-
-# Create threads to listen to each node
-PL_thread = Thread(target=listen_to_topic, args=("topic/PL", "PL_thread"), daemon=True)
-SC_thread = Thread(target=listen_to_topic, args=("topic/SC", "SC_thread"), daemon=True)
-SP_thread = Thread(target=listen_to_topic, args=("topic/SP", "SP_thread"), daemon=True)
-
-# Start both threads
-PL_thread.start()
-SC_thread.start()
-SP_thread.start()
-
-# Wait for both threads to finish
-# For syntax only, threads loop continuously
-PL_thread.join()
-SC_thread.join()
-SP_thread.join()
+            vibration, features = process_acceleration(decode_and_archive(node_key, raw), node_key) # Process acceleration
+        frames.update(node_key, {"vibration": vibration, "vibration_features": features})
+    except Exception as e:
+        print(f"Error processing vibration buffer for {node_key}: {e}")
+
+# Parse one message from a node, returns None for empty messages
+def parse_reading(payload):
+    payload = payload.strip()
+    return json.loads(payload) if payload else None
+
+# Handle one reading from a node without a vibration sensor
+def handle_reading(node_key, payload):
+    new_data = parse_reading(payload)
+    if new_data is not None:
+        frames.update(node_key, new_data)
+
+# Handle one reading from a vibration node, processed off the subscriber thread
+def handle_vibration_reading(node_key, payload):
+    new_data = parse_reading(payload)
+    if new_data is not None:
+        vibration_pool.submit(node_key, process_node_reading, node_key, new_data)
+
+# Handle a compact vibration buffer sent on a node's separate vibration topic
+def handle_compact_vibration(node_key, encoding, payload):
+    if payload:
+        vibration_pool.submit(node_key, process_compact_vibration, node_key, encoding, payload)
+
+# Everything below only runs when started as a script, so the benchmark in devtools can import the
+# processing functions above without connecting to the broker
+if __name__ == "__main__":
+    # Nodes sending compact vibration buffers publish them on their own topic
+    compact_nodes = [node for node in nodes if node.has_vibration and node.vibration_encoding != "hex"]
+
+    # One subscription for all nodes, messages are dispatched to a handler by topic
+    subscriber = MQTTSubscriber(MQTT_BROKER, MQTT_PORT, MQTT_USERNAME, MQTT_PASSWORD, client_id="aggregator-sub",
+                                topics=[INPUT_TOPIC] + [node.vibration_topic for node in compact_nodes])
+    for node in nodes:
+        handler = handle_vibration_reading if node.has_vibration else handle_reading
+        subscriber.add_handler(node.topic, partial(handler, node.key))
+    for node in compact_nodes:
+        subscriber.add_handler(node.vibration_topic, partial(handle_compact_vibration, node.key, node.vibration_encoding), raw=True)
+
+    atexit.register(waveform_archive.close)
+
+    # Connect to the broker once before any readings arrive
+    publisher.start()
+    frames.start()
+
+    # Continuously process readings from ESP32 and send to data analysis
+    subscriber.loop_forever()
@@ -7,7 +7,13 @@ import json
 import subprocess
 from datetime import date as D
 from time import sleep
-import threading
+from functools import partial
+
+# Make the shared modules in software/common importable when run as a script
+GUI_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(GUI_DIR, '..'))
+from common.mqtt_client import MQTTSubscriber
+from common.nodes import load_registry
 
 # create "root" widget
 root = T.Tk()
@@ -22,31 +28,31 @@ parent_pid = int(sys.argv[1]) if len(sys.argv) > 1 else None
 # MQTT configuration
 MQTT_BROKER = 'localhost'
 MQTT_PORT = '1337'
-INPUT_TOPIC = 'analysis/results'
-PL_POWER_TOPIC = 'topic/batteryPL'
-SC_POWER_TOPIC = 'topic/batterySC'
-SP_POWER_TOPIC = 'topic/batterySP'
+INPUT_TOPIC = 'analysis/v2/results'
+SCHEMA_TOPIC = 'analysis/v2/schema'
 MQTT_USERNAME = 'hackerfab2025'
 MQTT_PASSWORD = 'osu2025'
 
-# Sensor configuration
-PL_SENSORS = ('temperature',
-              'humidity',
-              'ambient_light',
-              'vibration')
+# Sensor configuration, stations and their sensors come from the node config (software/nodes.json)
+nodes = load_registry()
+STATIONS = {node.key: node.sensors for node in nodes}
+STATION_COLUMNS = nodes.gui.get('columns', 3)
 
-SC_SENSORS = ('temperature',
-              'humidity',
-              'particle_count',
-              'vibration')
+# Units to display each reading with, replaced by the ones analysis publishes on SCHEMA_TOPIC
+UNITS = {name: sensor.unit for name, sensor in nodes.sensors.items()}
 
-SP_SENSORS = ('temperature',
-              'humidity',
-              'ambient_light')
+def update_schema(payload):
+    try:
+        schema = json.loads(payload)
+        UNITS.update({name: sensor.get('unit', '') for name, sensor in schema['sensors'].items()})
+    except (ValueError, KeyError, AttributeError):
+        print(f'Invalid results schema received: {payload}')
 
-STATIONS = {'PL_data': PL_SENSORS,
-            'SC_data': SC_SENSORS,
-            'SP_data': SP_SENSORS}
+# Results carry plain numbers, a reading that was not numeric arrives as null
+def format_reading(sensor, value):
+    if value is None:
+        return 'Invalid'
+    return f'{float(value)} {UNITS.get(sensor, "")}'.rstrip()
 
 def update_vars(root, packet, stringVars, stations):
     try:
@@ -59,68 +65,30 @@ def update_vars(root, packet, stringVars, stations):
     stringVars['TB']['date'].set(D.today())
 
     for station, sensors in stations.items():
+        if station not in packet:
+            continue
         for sensor in sensors:
             if sensor in packet[station]:
-                stringVars[station][sensor].set(packet[station][sensor])
+                stringVars[station][sensor].set(format_reading(sensor, packet[station][sensor]))
         if 'status' in packet[station]:
             stringVars[station]['status'].set(packet[station]['status'])
 
     root.update_idletasks()
 
-def update_power(power_topic, power_var):
-    print(f'Listening to topic: {power_topic}')
-    command = [
-        'mosquitto_sub',
-        '-h', MQTT_BROKER,
-        '-p', MQTT_PORT,
-        '-u', MQTT_USERNAME,
-        '-P', MQTT_PASSWORD,
-        '-t', power_topic
-    ]
-
-    trying_to_connect = True
-    while trying_to_connect:
-        try:
-            with subprocess.Popen(command, stdout=subprocess.PIPE, text=True) as proc:
-                for line in proc.stdout:
-                    line = line.strip()
-                    try:
-                        power_var.set(json.loads(line))
-                    except ValueError:
-                        print(f'Invalid data received on topic "{power_topic}": {line}')
-                trying_to_connect = False
-        except Exception as e:
-            print(f'Error in listening to topic {power_topic}: {e}')
-
-def listen_to_topic(root, topic, stringVars, stations):
-    print(f'Listening to topic: {topic}')
-    command = [
-        'mosquitto_sub',
-        '-h', MQTT_BROKER,
-        '-p', MQTT_PORT,
-        '-u', MQTT_USERNAME,
-        '-P', MQTT_PASSWORD,
-        '-t', topic
-    ]
-
-    trying_to_connect = True
-    while trying_to_connect:
-        try:
-            with subprocess.Popen(command, stdout=subprocess.PIPE, text=True) as proc:
-                for line in proc.stdout:
-                    line = line.strip()
-                    try:
-                        packet = json.loads(line)
-                        update_vars(root, packet, stringVars, stations)
-                        for station, sensors in stations.items():
-                            for sensor in sensors:
-                                packet[station][sensor] = None
-                        packet['time'] = None
-                    except ValueError:
-                        print(f'Invalid data received on topic "{topic}": {line}')
-                trying_to_connect = False
-        except Exception as e:
-            print(f'Error in listening to topic {topic}: {e}')
+def update_power(power_var, payload):
+    payload = payload.strip()
+    try:
+        power_var.set(json.loads(payload))
+    except ValueError:
+        print(f'Invalid power data received: {payload}')
+
+def update_results(root, stringVars, stations, payload):
+    try:
+        packet = json.loads(payload)
+    except ValueError:
+        print(f'Invalid data received on topic "{INPUT_TOPIC}": {payload}')
+        return
+    update_vars(root, packet, stringVars, stations)
 
 TB_time = T.StringVar()
 TB_date = T.StringVar()
@@ -128,50 +96,11 @@ TB_date = T.StringVar()
 toolbar_vars = {'time': TB_time,
                 'date': TB_date}
 
-PL_temperature = T.StringVar()
-PL_humidity = T.StringVar()
-PL_ambient_light = T.StringVar()
-PL_vibration = T.StringVar()
-PL_status = T.StringVar()
-PL_power = T.StringVar()
-
-photolithography_vars = {'temperature': PL_temperature,
-                         'humidity': PL_humidity,
-                         'ambient_light': PL_ambient_light,
-                         'vibration': PL_vibration,
-                         'status': PL_status,
-                         'power': PL_power}
-
-SC_temperature = T.StringVar()
-SC_humidity = T.StringVar()
-SC_particle_count = T.StringVar()
-SC_vibration = T.StringVar()
-SC_status = T.StringVar()
-SC_power = T.StringVar()
-
-spin_coating_vars = {'temperature': SC_temperature,
-                     'humidity': SC_humidity,
-                     'particle_count': SC_particle_count,
-                     'vibration': SC_vibration,
-                     'status': SC_status,
-                     'power': SC_power}
-
-SP_temperature = T.StringVar()
-SP_humidity = T.StringVar()
-SP_ambient_light = T.StringVar()
-SP_status = T.StringVar()
-SP_power = T.StringVar()
-
-sputtering_vars = {'temperature': SP_temperature,
-                   'humidity': SP_humidity,
-                   'ambient_light': SP_ambient_light,
-                   'status': SP_status,
-                   'power': SP_power}
-
-STRINGVARS = {'TB': toolbar_vars,
-              'PL_data': photolithography_vars,
-              'SC_data': spin_coating_vars,
-              'SP_data': sputtering_vars}
+STRINGVARS = {'TB': toolbar_vars}
+for node in nodes:
+    STRINGVARS[node.key] = {sensor: T.StringVar() for sensor in node.sensors}
+    STRINGVARS[node.key]['status'] = T.StringVar()
+    STRINGVARS[node.key]['power'] = T.StringVar()
 
 toolbar = ttk.Frame(root, padding=10)
 stations = ttk.Frame(root, padding=10)
@@ -188,7 +117,7 @@ ttk.Label(toolbar, textvariable=STRINGVARS['TB']['date']).grid(row=0, column=9,
 
 def launch_child_script():
     try:
-        subprocess.Popen(['python3', './plot.py'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        subprocess.Popen(['python3', os.path.join(GUI_DIR, 'plot2.py')], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         print("Child script launched.")
     except Exception as e:
         print(f"Failed to launch script: {e}")
@@ -234,35 +163,31 @@ def make_station_frame(parent, title, sensor_dict, script_path, script_args=None
     frame.bind("<Button-1>", on_click)
     return frame
 
-PL_frame = make_station_frame(stations, 'Photolithography', STRINGVARS['PL_data'], './node-plot.py', ['PL'])
-SC_frame = make_station_frame(stations, 'Spin Coating', STRINGVARS['SC_data'], './node-plot.py', ['SC'])
-SP_frame = make_station_frame(stations, 'Sputtering', STRINGVARS['SP_data'], './node-plot.py', ['SP'])
-
 toolbar.grid(row=0, column=0, sticky='ew')
 stations.grid(row=1, column=0, sticky='nsew')
 
-PL_frame.grid(row=0, column=0, padx=10, pady=10, sticky='nsew')
-SC_frame.grid(row=0, column=1, padx=10, pady=10, sticky='nsew')
-SP_frame.grid(row=0, column=2, padx=10, pady=10, sticky='nsew')
+# One frame per station, wrapping onto a new row every STATION_COLUMNS stations
+for index, node in enumerate(nodes):
+    frame = make_station_frame(stations, node.title, STRINGVARS[node.key], os.path.join(GUI_DIR, 'node-plot.py'), [node.name])
+    frame.grid(row=index // STATION_COLUMNS, column=index % STATION_COLUMNS, padx=10, pady=10, sticky='nsew')
 
-stations.columnconfigure(0, weight=1)
-stations.columnconfigure(1, weight=1)
-stations.columnconfigure(2, weight=1)
+for column in range(min(len(nodes), STATION_COLUMNS)):
+    stations.columnconfigure(column, weight=1)
 
 root.columnconfigure(0, weight=1)
 root.rowconfigure(1, weight=1)
 
-listener_thread = threading.Thread(target=listen_to_topic, args=(root, INPUT_TOPIC, STRINGVARS, STATIONS), daemon=True)
-PL_power_thread = threading.Thread(target=update_power, args=(PL_POWER_TOPIC, STRINGVARS['PL_data']['power']), daemon=True)
-SC_power_thread = threading.Thread(target=update_power, args=(SC_POWER_TOPIC, STRINGVARS['SC_data']['power']), daemon=True)
-SP_power_thread = threading.Thread(target=update_power, args=(SP_POWER_TOPIC, STRINGVARS['SP_data']['power']), daemon=True)
-listener_thread.start()
-PL_power_thread.start()
-SC_power_thread.start()
-SP_power_thread.start()
+# One subscription for the analysis results, the retained results schema and every station's battery topic
+subscriber = MQTTSubscriber(MQTT_BROKER, MQTT_PORT, MQTT_USERNAME, MQTT_PASSWORD,
+                            topics=[INPUT_TOPIC, SCHEMA_TOPIC] + [node.power_topic for node in nodes])
+subscriber.add_handler(INPUT_TOPIC, partial(update_results, root, STRINGVARS, STATIONS))
+subscriber.add_handler(SCHEMA_TOPIC, update_schema)
+for node in nodes:
+    subscriber.add_handler(node.power_topic, partial(update_power, STRINGVARS[node.key]['power']))
+subscriber.start()
 
 # Save Data Button
-save_button = ttk.Button(root, text="Save Data", command=lambda: subprocess.Popen(['python3', './save_data.py'], stdout=subprocess.PIPE, stderr=subprocess.PIPE))
+save_button = ttk.Button(root, text="Save Data", command=lambda: subprocess.Popen(['python3', os.path.join(GUI_DIR, 'save_data.py')], stdout=subprocess.PIPE, stderr=subprocess.PIPE))
 save_button.grid(row=2, column=0, pady=(10, 30))
 
 def kill_parent():
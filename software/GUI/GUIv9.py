@@ -13,7 +13,7 @@ root.title('Hackerfab Monitoring System')
 # MQTT configuration
 MQTT_BROKER = 'localhost'
 MQTT_PORT = '1337'
-INPUT_TOPIC = 'analysis/results'
+INPUT_TOPIC = 'analysis/v2/results'
 MQTT_USERNAME = 'hackerfab2025'
 MQTT_PASSWORD = 'osu2025'
 
@@ -59,13 +59,13 @@ def update_vars(root, packet, stringVars, stations):
     for station, sensors in stations.items():
         if 'temperature' in sensors and 'temperature' in packet[station]:
             try:
-                temp_vals.append(float(packet[station]['temperature'][:5]))
+                temp_vals.append(float(packet[station]['temperature']))
             except (ValueError, TypeError):
                 print(f"failed1: {packet[station]['temperature']}")
                 pass
         if 'humidity' in sensors and 'humidity' in packet[station]:
             try:
-                humid_vals.append(float(packet[station]['humidity'][:5]))
+                humid_vals.append(float(packet[station]['humidity']))
             except (ValueError, TypeError):
                 pass
                 print("failed2")
@@ -1,5 +1,5 @@
+import os
 import sys
-import csv
 import json
 import subprocess
 import threading
@@ -11,67 +11,49 @@ import matplotlib.animation as animation
 import matplotlib.dates as mdates
 import math
 
+# Make the shared modules in software/common importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.nodes import load_registry
+from common.database import query_measurements
+
 # --- Configuration Section ---
-CSV_FILE = "/home/admin/Documents/capstone-project-software/software/measurements.csv"  # Path to the local CSV file for initial data load
+MEASUREMENTS_DB = "/home/admin/Documents/capstone-project-software/software/measurements/measurements.db"  # Stored measurements for initial data load
 WINDOW_SECONDS = 60  # Number of seconds to display on the graph (rolling window)
 MQTT_BROKER = "localhost"  # MQTT broker address
 MQTT_PORT = 1337  # MQTT broker port
 INPUT_TOPIC = "reading/formatted"  # MQTT topic for incoming data
 
-# Define which metrics each node type sends
-NODE_METRICS = {
-    "PL": ["temperature", "humidity", "ambient_light", "vibration"],
-    "SC": ["temperature", "humidity", "particle_count", "vibration"],
-    "SP": ["temperature", "humidity", "ambient_light"],
-}
-
-# Human-readable CSV headers for each metric
-CSV_HEADERS = {
-    "temperature": "Temperature (°C)",
-    "humidity": "Humidity (%)",
-    "ambient_light": "Ambient Light (lux)",
-    "particle_count": "Particle Count",
-    "vibration": "Vibration",
-}
+# Define which metrics each node type sends, from the node config (software/nodes.json)
+nodes = load_registry()
+NODE_METRICS = {node.name: list(node.sensors) for node in nodes}
 
 # Default Y-axis bounds if autoscale is not used
-Y_BOUNDS = {
-    "temperature": (10, 40),
-    "humidity": (0, 100),
-    "ambient_light": (0, 100),
-    "particle_count": (0, 100),
-    "vibration": (0, 4),
-}
+Y_BOUNDS = {name: sensor.y_bounds for name, sensor in nodes.sensors.items()}
 
 # --- Handle Command-Line Arguments ---
-# Make sure the user passed in a valid node type (PL, SC, or SP)
+# Make sure the user passed in a valid node type from the config
 if len(sys.argv) < 2 or sys.argv[1] not in NODE_METRICS:
-    print("Usage: python script.py <PL|SC|SP>")
+    print(f"Usage: python script.py <{'|'.join(NODE_METRICS)}>")
     sys.exit(1)
 
 node_type = sys.argv[1]
+node_key = nodes.by_name[node_type].key
 metrics = NODE_METRICS[node_type]  # Metrics to monitor for this node type
 data = {metric: deque() for metric in metrics}  # Stores recent values for each metric
 autoscale = False  # Flag to toggle Y-axis autoscaling
 axes_locked = {metric: False for metric in metrics}  # Tracks which plots are frozen
 
-# --- CSV Initialization ---
-# Load past measurements from CSV to populate the graph initially
+# --- Stored Data Initialization ---
+# Load this node's stored measurements from the visible window to populate the graph initially
 def load_initial_data():
-    try:
-        with open(CSV_FILE, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row["Node"] != node_type:
-                    continue
-                timestamp = datetime.fromisoformat(row["Timestamp"])
-                for metric in metrics:
-                    val = row.get(CSV_HEADERS[metric])
-                    if val:
-                        data[metric].append((timestamp, float(val)))
-        trim_old_data()
-    except FileNotFoundError:
-        print(f"{CSV_FILE} not found.")
+    start = datetime.now() - timedelta(seconds=WINDOW_SECONDS)
+    for row in query_measurements(MEASUREMENTS_DB, start=start, node=node_type):
+        timestamp = datetime.fromtimestamp(row["timestamp"])
+        for metric in metrics:
+            val = row.get(metric)
+            if isinstance(val, (int, float)):
+                data[metric].append((timestamp, val))
+    trim_old_data()
 
 # Remove old data points that fall outside the visible time window
 def trim_old_data():
@@ -91,15 +73,12 @@ def listen_to_mqtt():
         try:
             msg = json.loads(line.strip())
             overall_time = datetime.fromisoformat(msg.get("time", datetime.now().isoformat()))
-            node_data = msg.get(f"{node_type}_data", {})
+            node_data = msg.get(node_key) or {}
             for metric in metrics:
                 value = node_data.get(metric)
-                if value is not None:
-                    try:
-                        value = float(str(value).replace(" g", ""))  # Clean up value string if needed
-                        data[metric].append((overall_time, value))
-                    except:
-                        continue
+                # Readings arrive as plain numbers, anything else is skipped
+                if isinstance(value, (int, float)):
+                    data[metric].append((overall_time, value))
             trim_old_data()
         except Exception as e:
             print(f"[ERROR] {e} | Raw line: {line.strip()}")
@@ -1,4 +1,5 @@
-import csv
+import os
+import sys
 import json
 import subprocess
 import threading
@@ -10,34 +11,27 @@ from matplotlib.widgets import Button
 from functools import partial
 import matplotlib.dates as mdates
 
+# Make the shared modules in software/common importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.nodes import load_registry
+from common.database import query_measurements
+
 # --- Configuration ---
 # Constants for file paths, MQTT settings, data time window, and node/metric config.
-CSV_FILE = "/home/admin/Documents/capstone-project-software/software/measurements.csv"
+MEASUREMENTS_DB = "/home/admin/Documents/capstone-project-software/software/measurements/measurements.db"
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1337
 INPUT_TOPIC = "reading/formatted"
 WINDOW_SECONDS = 150  # Show the last 2.5 minutes of data on the plot
-NODES = ["PL", "SC", "SP"]  # Node identifiers
-METRICS = ["temperature", "humidity", "ambient_light", "particle_count", "vibration"]  # Sensor types
-NODE_COLORS = {"PL": "tab:blue", "SC": "tab:green", "SP": "tab:red"}  # Assign consistent colors to each node
 
-# Define Y-axis bounds for each metric (used if autoscale is off)
-Y_BOUNDS = {
-    "temperature": (10, 40),
-    "humidity": (0, 100),
-    "ambient_light": (0, 100),
-    "particle_count": (0, 100),
-    "vibration": (0, 4),
-}
+# Nodes, their colors and the sensors they report come from the node config (software/nodes.json)
+nodes = load_registry()
+NODES = nodes.names  # Node identifiers
+METRICS = nodes.metrics  # Sensor types
+NODE_COLORS = {node.name: node.color for node in nodes}  # Assign consistent colors to each node
 
-# Mapping from metric to CSV header name
-CSV_HEADERS = {
-    "temperature": "Temperature (°C)",
-    "humidity": "Humidity (%)",
-    "ambient_light": "Ambient Light (lux)",
-    "particle_count": "Particle Count",
-    "vibration": "Vibration",
-}
+# Define Y-axis bounds for each metric (used if autoscale is off)
+Y_BOUNDS = {metric: nodes.sensors[metric].y_bounds for metric in METRICS}
 
 # --- State ---
 # Initialize the main program state: metric data storage, UI flags, and locking mechanism.
@@ -49,28 +43,24 @@ autoscale_y = False  # Y-axis autoscaling flag
 vibration_lock = threading.Lock()  # Thread-safe lock for shared data
 axes_locked = False  # Prevent auto-reset when user zooms/pans
 
-# --- Load CSV Data ---
-# Populate the plot with existing CSV data at startup.
+# --- Load Stored Data ---
+# Populate the plot with stored measurements from the visible window at startup.
 def load_initial_data():
-    try:
-        with open(CSV_FILE, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    node = row["Node"]
-                    timestamp = datetime.fromisoformat(row["Timestamp"])
-                    for metric in METRICS:
-                        csv_col = CSV_HEADERS.get(metric)
-                        value_str = row.get(csv_col)
-                        if value_str:
-                            value = float(value_str)
-                            with vibration_lock:
-                                metric_data[metric][node].append((timestamp, value))
-                except Exception:
-                    continue  # Skip problematic rows
-        trim_old_data()  # Ensure no stale data is left
-    except FileNotFoundError:
-        print(f"{CSV_FILE} not found. Starting with empty data.")
+    start = datetime.now() - timedelta(seconds=WINDOW_SECONDS)
+    for row in query_measurements(MEASUREMENTS_DB, start=start):
+        try:
+            node = row["node"]
+            if node not in nodes.by_name:
+                continue  # Skip nodes no longer in the config
+            timestamp = datetime.fromtimestamp(row["timestamp"])
+            for metric in METRICS:
+                value = row.get(metric)
+                if isinstance(value, (int, float)):
+                    with vibration_lock:
+                        metric_data[metric][node].append((timestamp, value))
+        except Exception:
+            continue  # Skip problematic rows
+    trim_old_data()  # Ensure no stale data is left
 
 # --- Trim Old Data ---
 # Keep only recent data within the specified time window
@@ -93,18 +83,15 @@ def listen_for_mqtt():
         try:
             msg = json.loads(line.strip())
             overall_time = datetime.fromisoformat(msg.get("time", datetime.now().isoformat()))
-            for node_key in ["PL_data", "SC_data", "SP_data"]:
-                node = node_key.split("_")[0]
-                node_data = msg.get(node_key, {})
+            for node_info in nodes:
+                node = node_info.name
+                node_data = msg.get(node_info.key) or {}
                 for metric in METRICS:
                     value = node_data.get(metric)
-                    if value is not None:
-                        try:
-                            value = float(str(value).replace(" g", ""))
-                            with vibration_lock:
-                                metric_data[metric][node].append((overall_time, value))
-                        except:
-                            continue
+                    # Readings arrive as plain numbers, anything else is skipped
+                    if isinstance(value, (int, float)):
+                        with vibration_lock:
+                            metric_data[metric][node].append((overall_time, value))
             trim_old_data()
         except Exception as e:
             print(f"[ERROR] {e} | Raw line: {line.strip()}")
@@ -232,29 +219,29 @@ control_start_x = 0.25
 btn_axes = {
     "close": plt.axes([control_start_x + control_spacing * 0, 0.01, 0.13, button_height]),
     "autoscale_toggle": plt.axes([control_start_x + control_spacing * 1, 0.01, 0.13, button_height]),
-    "toggle_pl": plt.axes([control_start_x + control_spacing * 2, 0.01, 0.13, button_height]),
-    "toggle_sc": plt.axes([control_start_x + control_spacing * 3, 0.01, 0.13, button_height]),
-    "toggle_sp": plt.axes([control_start_x + control_spacing * 4, 0.01, 0.13, button_height]),
 }
 
 # Initialize and bind buttons
 btn_close = Button(btn_axes["close"], "Close")
 btn_autoscale = Button(btn_axes["autoscale_toggle"], "Auto/Reset Y")
-btn_pl = Button(btn_axes["toggle_pl"], "Toggle PL")
-btn_sc = Button(btn_axes["toggle_sc"], "Toggle SC")
-btn_sp = Button(btn_axes["toggle_sp"], "Toggle SP")
 
 btn_close.on_clicked(on_close)
 btn_autoscale.on_clicked(toggle_autoscale)
-btn_pl.on_clicked(partial(toggle_node, "PL"))
-btn_sc.on_clicked(partial(toggle_node, "SC"))
-btn_sp.on_clicked(partial(toggle_node, "SP"))
+
+# One toggle button per node, shrinking to fit the remaining width
+toggle_width = min(0.13, (1 - control_start_x - control_spacing * 2) / max(len(NODES), 1) - 0.01)
+node_buttons = {}
+for idx, node in enumerate(NODES):
+    btn_ax = plt.axes([control_start_x + control_spacing * 2 + idx * (toggle_width + 0.01), 0.01, toggle_width, button_height])
+    btn = Button(btn_ax, f"Toggle {node}")
+    btn.on_clicked(partial(toggle_node, node))
+    node_buttons[node] = btn
 
 # Start the animation loop for continuous plot updates
 ani = animation.FuncAnimation(fig, update_plot, interval=1000, cache_frame_data=False)
 
 # --- Fullscreen Toggle ---
-Resize the window to fill the screen for a better user experience
+# Resize the window to fill the screen for a better user experience
 mng = plt.get_current_fig_manager()
 screen_width = mng.window.winfo_screenwidth()
 screen_height = mng.window.winfo_screenheight() - 50
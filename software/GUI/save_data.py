@@ -1,31 +1,38 @@
+import os
+import sys
 import csv
-from datetime import datetime, timedelta
+from datetime import timedelta
 
-INPUT_FILE = '/home/admin/Documents/capstone-project-software/software/measurements.csv'
-TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+# Make the shared modules in software/common importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.database import query_measurements, latest_measurement_time
+from common.measurements import SENSOR_FIELDS
+from common.store import MEASUREMENT_HEADER
 
-# Read the data from CSV
-with open(INPUT_FILE, 'r', newline='') as infile:
-    reader = list(csv.DictReader(infile))
+MEASUREMENTS_DB = '/home/admin/Documents/capstone-project-software/software/measurements/measurements.db'
 
 # Get the most recent timestamp
-latest_time = max(datetime.strptime(row['Timestamp'], TIME_FORMAT) for row in reader)
+latest_time = latest_measurement_time(MEASUREMENTS_DB)
+if latest_time is None:
+    print("No data found in the last 5 minutes.")
+    sys.exit(0)
 
 # Compute the cutoff time (5 minutes before latest)
 cutoff_time = latest_time - timedelta(minutes=5)
 
-# Filter the rows within the last 5 minutes
-filtered_rows = [row for row in reader if datetime.strptime(row['Timestamp'], TIME_FORMAT) >= cutoff_time]
+# Query only the rows within the last 5 minutes from the measurement database
+filtered_rows = [[row["node"]] + [row[sensor] for sensor in SENSOR_FIELDS] + [row["time"]]
+                 for row in query_measurements(MEASUREMENTS_DB, start=cutoff_time)]
 
 # Generate output filename with timestamp
 timestamp_str = latest_time.strftime('%Y%m%d_%H%M%S')
 output_file = f'saved_data_{timestamp_str}.csv'
 
-# Save the filtered rows to a new CSV
+# Save the filtered rows to a new CSV, with the same columns as measurements.csv
 if filtered_rows:
     with open(output_file, 'w', newline='') as outfile:
-        writer = csv.DictWriter(outfile, fieldnames=filtered_rows[0].keys())
-        writer.writeheader()
+        writer = csv.writer(outfile)
+        writer.writerow(MEASUREMENT_HEADER)
         writer.writerows(filtered_rows)
     print(f"Saved {len(filtered_rows)} rows to {output_file}")
 else:
@@ -0,0 +1,4 @@
+# Shared modules used by the aggregator, analysis and GUI scripts.
+#
+# The scripts are launched directly by path (see master-code.py), so each one
+# adds the software/ directory to sys.path before importing from this package.
@@ -0,0 +1,186 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Long-term measurement history, one directory per node and day:
+#   <directory>/<node>/<YYYY-MM-DD>/time.f64     epoch seconds
+#   <directory>/<node>/<YYYY-MM-DD>/<sensor>.f32 readings, NaN when missing or not numeric
+# Row i of every column in a day directory belongs to the same measurement.
+TIME_COLUMN = "time"
+TIME_DTYPE = np.float64
+VALUE_DTYPE = np.float32
+DAY_FORMAT = "%Y-%m-%d"
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+def _column_path(directory, node, day, column):
+    extension = "f64" if column == TIME_COLUMN else "f32"
+    return os.path.join(directory, node, day.strftime(DAY_FORMAT), f"{column}.{extension}")
+
+
+class ColumnarArchive:
+    """Append-only columnar archive of measurements for months of history.
+
+    Every reading is stored as a raw float32 in its sensor's column file for
+    the node and (local) day, next to a float64 epoch time column, so a range
+    query on one sensor only reads that sensor's pages. Rows are buffered and
+    appended every flush_interval seconds (call poll() periodically to flush
+    while no rows arrive). Column files of the current day stay open.
+    """
+
+    def __init__(self, directory, sensors, flush_interval=DEFAULT_FLUSH_INTERVAL, clock=time.time):
+        self.directory = directory
+        self.sensors = tuple(sensors)
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self._pending = {}
+        self._files = {}
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, measurement):
+        day = datetime.fromtimestamp(measurement.timestamp).date()
+        row = [measurement.timestamp]
+        for sensor in self.sensors:
+            value = getattr(measurement, sensor, None)
+            row.append(value if isinstance(value, (int, float)) else np.nan)
+        with self._lock:
+            self._pending.setdefault((measurement.node, day), []).append(row)
+            if self.clock() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    # Flush if rows have been waiting longer than flush_interval
+    def poll(self):
+        with self._lock:
+            if self._pending and self.clock() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            for files in self._files.values():
+                for f in files.values():
+                    f.close()
+            self._files = {}
+
+    def _flush(self):
+        pending, self._pending = self._pending, {}
+        for (node, day), rows in pending.items():
+            files = self._open(node, day)
+            rows = np.array(rows, dtype=TIME_DTYPE)
+            # Values first and time last, so a crash mid-flush never leaves times without readings
+            for j, sensor in enumerate(self.sensors, start=1):
+                rows[:, j].astype(VALUE_DTYPE).tofile(files[sensor])
+                files[sensor].flush()
+            rows[:, 0].tofile(files[TIME_COLUMN])
+            files[TIME_COLUMN].flush()
+        self._last_flush = self.clock()
+
+    def _open(self, node, day):
+        files = self._files.get((node, day))
+        if files is None:
+            # A new day: the previous days of this node are complete
+            for key in [key for key in self._files if key[0] == node]:
+                for f in self._files.pop(key).values():
+                    f.close()
+            os.makedirs(os.path.dirname(_column_path(self.directory, node, day, TIME_COLUMN)), exist_ok=True)
+            # Keep the columns aligned when reopening a day: drop readings a crash left behind
+            # without their time, and pad a sensor added to the config since with NaN
+            rows = _rows(_column_path(self.directory, node, day, TIME_COLUMN), TIME_DTYPE)
+            for sensor in self.sensors:
+                path = _column_path(self.directory, node, day, sensor)
+                if os.path.exists(path):
+                    os.truncate(path, min(_rows(path, VALUE_DTYPE), rows) * np.dtype(VALUE_DTYPE).itemsize)
+                missing = rows - _rows(path, VALUE_DTYPE)
+                if missing > 0:
+                    with open(path, "ab") as f:
+                        np.full(missing, np.nan, dtype=VALUE_DTYPE).tofile(f)
+            files = self._files[(node, day)] = {
+                column: open(_column_path(self.directory, node, day, column), "ab")
+                for column in (TIME_COLUMN,) + self.sensors
+            }
+        return files
+
+
+def _rows(path, dtype):
+    try:
+        return os.path.getsize(path) // np.dtype(dtype).itemsize
+    except FileNotFoundError:
+        return 0
+
+
+def _memmap(path, dtype):
+    if not os.path.exists(path):
+        return None
+    size = _rows(path, dtype)
+    if size == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(size,))
+
+
+def archive_days(directory, node):
+    """Days that have archived rows for node, oldest first."""
+    try:
+        names = os.listdir(os.path.join(directory, node))
+    except FileNotFoundError:
+        return []
+    days = []
+    for name in names:
+        try:
+            days.append(datetime.strptime(name, DAY_FORMAT).date())
+        except ValueError:
+            continue
+    return sorted(days)
+
+
+def scan_column(directory, node, sensor, start=None, end=None):
+    """Yield (times, values) arrays for one node and sensor, one pair per archived day.
+
+    start and end are datetimes bounding the time column (inclusive). Rows
+    are stored in the order analysis received them, which is time order
+    unless a node reported late. Days in time order are sliced with a binary
+    search and yielded as read-only memory maps of the column files, so
+    scanning a year keeps only the pages being used in RAM. Days with late
+    rows are filtered with a mask instead and their rows sorted by time.
+    """
+    start_ts = start.timestamp() if start is not None else -np.inf
+    end_ts = end.timestamp() if end is not None else np.inf
+    for day in archive_days(directory, node):
+        day_start = datetime.combine(day, datetime.min.time()).timestamp()
+        day_end = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+        if day_end <= start_ts or day_start > end_ts:
+            continue
+        times = _memmap(_column_path(directory, node, day, TIME_COLUMN), TIME_DTYPE)
+        values = _memmap(_column_path(directory, node, day, sensor), VALUE_DTYPE)
+        if times is None or values is None:
+            continue
+        # The time column is written last, so it never has more rows than the values
+        length = min(len(times), len(values))
+        times = times[:length]
+        if np.all(times[1:] >= times[:-1]):
+            first = np.searchsorted(times, start_ts, side="left")
+            last = np.searchsorted(times, end_ts, side="right")
+            if first < last:
+                yield times[first:last], values[first:last]
+            continue
+        rows = np.flatnonzero((times >= start_ts) & (times <= end_ts))
+        if rows.size:
+            rows = rows[np.argsort(times[rows], kind="stable")]
+            yield times[rows], values[rows]
+
+
+def read_column(directory, node, sensor, start=None, end=None):
+    """(times, values) of one node and sensor between start and end as in-memory arrays."""
+    days = list(scan_column(directory, node, sensor, start, end))
+    if not days:
+        return np.empty(0, dtype=TIME_DTYPE), np.empty(0, dtype=VALUE_DTYPE)
+    return (np.concatenate([times for times, _ in days]),
+            np.concatenate([values for _, values in days]))
@@ -0,0 +1,108 @@
+import csv
+import heapq
+from datetime import datetime
+
+from common.database import query_measurements
+
+# One row per excursion episode in context_data.csv
+CONTEXT_HEADER = ["Node", "Start", "End", "Out-of-range Readings", "Reasons", "Context Start", "Context End"]
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).replace(microsecond=0).isoformat()
+
+
+class Episode:
+    """A run of out-of-range readings from one node.
+
+    Instead of copying the surrounding readings for every bad measurement,
+    analysis records one row per episode: when it started and ended, how many
+    readings were out of range and why, and the context window to read back
+    from the measurement database.
+    """
+
+    __slots__ = ("node", "start", "end", "start_time", "end_time", "count", "reasons")
+
+    def __init__(self, node, timestamp, time, reasons):
+        self.node = node
+        self.start = self.end = timestamp
+        self.start_time = self.end_time = time
+        self.count = 1
+        self.reasons = dict.fromkeys(reasons)
+
+    def extend(self, timestamp, time, reasons):
+        if timestamp >= self.end:
+            self.end = timestamp
+            self.end_time = time
+        self.count += 1
+        self.reasons.update(dict.fromkeys(reasons))
+
+    def row(self, window):
+        return [self.node, self.start_time, self.end_time, self.count, "; ".join(self.reasons),
+                _iso(self.start - window), _iso(self.end + window)]
+
+
+class PostErrorWindows:
+    """Post-error windows per node: a deadline heap plus each node's latest deadline.
+
+    add() is O(log n), membership checks are O(1) and expire() pops only the
+    windows that have ended. A node stays active until the window of its
+    latest error ends, older windows of the same node are skipped when popped.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}
+
+    def __contains__(self, node):
+        return node in self._deadlines
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def add(self, node, deadline):
+        if deadline > self._deadlines.get(node, float("-inf")):
+            self._deadlines[node] = deadline
+            heapq.heappush(self._heap, (deadline, node))
+
+    def expire(self, now):
+        """Remove every window that ended before now, returning the nodes that are no longer active."""
+        expired = []
+        while self._heap and self._heap[0][0] < now:
+            deadline, node = heapq.heappop(self._heap)
+            if self._deadlines.get(node) == deadline:
+                del self._deadlines[node]
+                expired.append(node)
+        return expired
+
+
+def read_episodes(path):
+    """Episodes recorded in a context file, as dicts keyed by CONTEXT_HEADER."""
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+    except FileNotFoundError:
+        return []
+
+
+def context_view(episode, database_path):
+    """Rebuild the context rows of one episode (a row from read_episodes).
+
+    Returns (measurement, context type) pairs in time order, where measurement
+    is a dict from query_measurements and the type is "Exact moment" for the
+    out-of-range readings, "Surrounding Errors" for the others up to the end of
+    the episode and "Surrounding Errors (post)" after it, as context_data.csv
+    used to hold them. Only the episode's context window is read.
+    """
+    end = datetime.fromisoformat(episode["End"]).timestamp()
+    view = []
+    for row in query_measurements(database_path, start=datetime.fromisoformat(episode["Context Start"]),
+                                  end=datetime.fromisoformat(episode["Context End"]), node=episode["Node"]):
+        if row["reasons"] is not None and episode["Start"] <= row["time"] <= episode["End"]:
+            context_type = "Exact moment"
+        elif row["timestamp"] > end:
+            context_type = "Surrounding Errors (post)"
+        else:
+            context_type = "Surrounding Errors"
+        view.append((row, context_type))
+    return view
@@ -0,0 +1,227 @@
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+from common.measurements import SENSOR_FIELDS
+from common.rollups import ROLLUP_COLUMNS
+
+# Measurement history written by analysis and queried by the plots, save_data.py and context views.
+# Sensors from the node config that are not in SENSOR_FIELDS get a column of their own after these.
+MEASUREMENTS_DB = "measurements.db"
+MEASUREMENT_COLUMNS = ("node", "timestamp", "time") + SENSOR_FIELDS + ("status", "reasons")
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_FLUSH_ROWS = 500
+# Seconds between deletes of rows older than the retention
+PRUNE_INTERVAL = 10 * 60
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS measurements (
+    node TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    time TEXT,
+    {", ".join(f"{sensor} REAL" for sensor in SENSOR_FIELDS)},
+    status TEXT,
+    reasons TEXT
+);
+CREATE INDEX IF NOT EXISTS measurements_node_timestamp ON measurements (node, timestamp);
+CREATE INDEX IF NOT EXISTS measurements_timestamp ON measurements (timestamp);
+CREATE TABLE IF NOT EXISTS rollups (
+    node TEXT NOT NULL,
+    sensor TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    start REAL NOT NULL,
+    count INTEGER NOT NULL,
+    min REAL,
+    max REAL,
+    mean REAL,
+    PRIMARY KEY (node, sensor, resolution, start)
+);
+"""
+
+# A bucket written twice (its partial rollup at shutdown, the rest after a restart) is merged
+_INSERT_ROLLUP = f"""
+INSERT INTO rollups ({", ".join(ROLLUP_COLUMNS)}) VALUES ({", ".join("?" * len(ROLLUP_COLUMNS))})
+ON CONFLICT (node, sensor, resolution, start) DO UPDATE SET
+    count = count + excluded.count,
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max),
+    mean = (mean * count + excluded.mean * excluded.count) / (count + excluded.count)
+"""
+
+
+class MeasurementDatabase:
+    """Measurement history in an SQLite database in WAL mode, indexed on (node, timestamp).
+
+    Rows are buffered and inserted in one transaction every flush_interval
+    seconds or flush_rows rows, whichever comes first (call poll() periodically
+    to flush while no rows arrive). In WAL mode readers in other processes run
+    their range queries while the writer commits, without blocking each other.
+    Rows older than retention seconds are deleted every PRUNE_INTERVAL.
+    Minute and hour rollups from common.rollups are stored in the same database
+    and kept regardless of the retention. sensors are the sensor columns to
+    write, a REAL column is added for each one the table does not have yet.
+    """
+
+    def __init__(self, path, sensors=SENSOR_FIELDS, retention=None, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 flush_rows=DEFAULT_FLUSH_ROWS, clock=time.time):
+        for sensor in sensors:
+            if not sensor.isidentifier():
+                raise ValueError(f"Sensor name '{sensor}' cannot be used as a database column")
+        self.path = path
+        self.sensors = tuple(sensors)
+        self.columns = ("node", "timestamp", "time") + self.sensors + ("status", "reasons")
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.clock = clock
+        self._pending = []
+        self._pending_rollups = []
+        self._last_flush = clock()
+        self._last_prune = None
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Writes come from the persist worker and the periodic flush thread, serialized by _lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(measurements)")}
+        for sensor in self.sensors:
+            if sensor not in existing:
+                self._db.execute(f"ALTER TABLE measurements ADD COLUMN {sensor} REAL")
+        self._db.commit()
+
+    def write(self, measurement, reasons=None):
+        row = (measurement.node, measurement.timestamp, measurement.time) + \
+              tuple(getattr(measurement, sensor, None) for sensor in self.sensors) + (measurement.status, reasons)
+        with self._lock:
+            if self._db is None:
+                raise ValueError(f"{self.path} is closed")
+            self._pending.append(row)
+            if len(self._pending) >= self.flush_rows or self.clock() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    # Rows from RollupAggregator, inserted with the next batch of measurements
+    def write_rollups(self, rows):
+        with self._lock:
+            if self._db is None:
+                raise ValueError(f"{self.path} is closed")
+            self._pending_rollups.extend(rows)
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    # Flush if rows have been waiting longer than flush_interval
+    def poll(self):
+        with self._lock:
+            if (self._pending or self._pending_rollups) and self.clock() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._flush()
+                self._db.close()
+                self._db = None
+
+    def _flush(self):
+        self._last_flush = now = self.clock()
+        if self._db is None:
+            return
+        with self._db:
+            if self._pending:
+                self._db.executemany(f"INSERT INTO measurements ({', '.join(self.columns)}) "
+                                     f"VALUES ({', '.join('?' * len(self.columns))})", self._pending)
+                self._pending = []
+            if self._pending_rollups:
+                self._db.executemany(_INSERT_ROLLUP, self._pending_rollups)
+                self._pending_rollups = []
+            if self.retention is not None and (self._last_prune is None or now - self._last_prune >= PRUNE_INTERVAL):
+                self._db.execute("DELETE FROM measurements WHERE timestamp < ?", (now - self.retention,))
+                self._last_prune = now
+
+
+def _connect_readonly(path):
+    if not os.path.exists(path):
+        return None
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    db.row_factory = sqlite3.Row
+    return db
+
+
+def query_measurements(path, start=None, end=None, node=None, out_of_range=False):
+    """Yield stored measurements as dicts keyed by column name, oldest first.
+
+    Rows have the MEASUREMENT_COLUMNS plus any sensor columns added for the
+    node config. start and end are datetimes bounding the timestamp
+    (inclusive) and node keeps only that node's rows, all answered from the
+    indexes. With out_of_range only measurements that had out-of-range
+    reasons are returned.
+    """
+    db = _connect_readonly(path)
+    if db is None:
+        return
+    conditions, params = [], []
+    if node is not None:
+        conditions.append("node = ?")
+        params.append(node)
+    if start is not None:
+        conditions.append("timestamp >= ?")
+        params.append(start.timestamp())
+    if end is not None:
+        conditions.append("timestamp <= ?")
+        params.append(end.timestamp())
+    if out_of_range:
+        conditions.append("reasons IS NOT NULL")
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    try:
+        for row in db.execute(f"SELECT * FROM measurements{where} ORDER BY timestamp", params):
+            yield dict(row)
+    finally:
+        db.close()
+
+
+def latest_measurement_time(path):
+    """Newest measurement timestamp in the database as a datetime, or None if it is empty."""
+    db = _connect_readonly(path)
+    if db is None:
+        return None
+    try:
+        latest = db.execute("SELECT MAX(timestamp) FROM measurements").fetchone()[0]
+    finally:
+        db.close()
+    return datetime.fromtimestamp(latest) if latest is not None else None
+
+
+def query_rollups(path, resolution, node=None, sensor=None, start=None, end=None):
+    """Rollup rows at one resolution (seconds) as dicts keyed by ROLLUP_COLUMNS, oldest first.
+
+    start and end are datetimes bounding the bucket start (inclusive). A week
+    of 1-hour rollups is 168 rows per node and sensor.
+    """
+    db = _connect_readonly(path)
+    if db is None:
+        return []
+    conditions, params = ["resolution = ?"], [resolution]
+    for column, value in (("node", node), ("sensor", sensor)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    if start is not None:
+        conditions.append("start >= ?")
+        params.append(start.timestamp())
+    if end is not None:
+        conditions.append("start <= ?")
+        params.append(end.timestamp())
+    try:
+        return [dict(row) for row in db.execute(f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM rollups "
+                                                f"WHERE {' AND '.join(conditions)} ORDER BY start", params)]
+    finally:
+        db.close()
@@ -0,0 +1,88 @@
+import time
+import threading
+from datetime import datetime
+
+# Seconds a frame may wait for slow nodes after its first reading arrives
+DEFAULT_DEADLINE = 3.0
+
+
+class FrameAssembler:
+    """Aligns readings from every node into frames with a bounded wait.
+
+    The window for a frame opens when its first reading arrives. The frame is
+    emitted as soon as every node has reported all of its fields, or when the
+    deadline passes, whichever comes first. Nodes that sent nothing during the
+    window are listed under "stale" and their fields are left as None.
+
+    schema maps each node key (e.g. "PL_data") to the fields it reports.
+    on_frame is called with each finished frame while the assembler lock is
+    held, so frames are delivered one at a time and in order.
+    """
+
+    def __init__(self, schema, on_frame, deadline=DEFAULT_DEADLINE, clock=time.monotonic):
+        self.schema = {node_key: tuple(fields) for node_key, fields in schema.items()}
+        self.on_frame = on_frame
+        self.deadline = deadline
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._window_opened = None
+        self._window_time = None
+        self._ticker = None
+
+    def update(self, node_key, reading):
+        """Merge one node's reading into the open frame, emitting it if complete."""
+        fields = self.schema[node_key]
+        with self._lock:
+            current = self._pending.get(node_key) or dict.fromkeys(fields)
+            self._pending[node_key] = {field: reading[field] if field in reading else current[field]
+                                       for field in fields}
+            if self._window_opened is None:
+                self._window_opened = self.clock()
+                self._window_time = datetime.now().replace(microsecond=0).isoformat()
+            if self._is_complete():
+                self._emit()
+
+    def poll(self, now=None):
+        """Emit the open frame if its deadline has passed."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            if self._window_opened is not None and now - self._window_opened >= self.deadline:
+                self._emit()
+
+    # Check the open frame every interval seconds on a background thread
+    def start(self, interval=0.1):
+        def tick():
+            while True:
+                time.sleep(interval)
+                self.poll()
+
+        self._ticker = threading.Thread(target=tick, daemon=True)
+        self._ticker.start()
+
+    def _is_complete(self):
+        for node_key, fields in self.schema.items():
+            reading = self._pending.get(node_key)
+            if reading is None or any(reading[field] is None for field in fields):
+                return False
+        return True
+
+    def _emit(self):
+        frame = {}
+        stale = []
+        for node_key, fields in self.schema.items():
+            reading = self._pending.get(node_key)
+            if reading is None:
+                stale.append(node_key)
+                reading = dict.fromkeys(fields)
+            frame[node_key] = reading
+        frame["time"] = self._window_time
+        if stale:
+            frame["stale"] = stale
+
+        # Reset for the next frame
+        self._pending = {}
+        self._window_opened = None
+        self._window_time = None
+
+        self.on_frame(frame)
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+# Sensors a Measurement has a slot for, other sensors from the node config are kept in its extra dict
+SENSOR_FIELDS = ("temperature", "humidity", "ambient_light", "particle_count", "vibration")
+
+
+# Readings arrive as JSON numbers or strings, values that are not numeric are kept as-is
+def _to_float(value):
+    if value is None or isinstance(value, float):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class Measurement:
+    """One node's reading as used by analysis, with its time parsed once at ingest.
+
+    time is the ISO string the reading arrived with (written to the CSVs and
+    published), timestamp is the same instant in epoch seconds for every
+    comparison. Sensors the node did not report are None. Sensors outside
+    SENSOR_FIELDS (given to from_reading by name) are read as attributes too.
+    """
+
+    __slots__ = ("node", "time", "timestamp", "status", "extra") + SENSOR_FIELDS
+
+    def __init__(self, node, time, timestamp, temperature=None, humidity=None, ambient_light=None,
+                 particle_count=None, vibration=None, status=None, **extra):
+        self.node = node
+        self.time = time
+        self.timestamp = timestamp
+        self.temperature = temperature
+        self.humidity = humidity
+        self.ambient_light = ambient_light
+        self.particle_count = particle_count
+        self.vibration = vibration
+        self.status = status
+        self.extra = extra
+
+    # Only called when there is no slot of that name, i.e. for sensors kept in extra
+    def __getattr__(self, name):
+        try:
+            return object.__getattribute__(self, "extra")[name]
+        except (AttributeError, KeyError):
+            raise AttributeError(f"'Measurement' object has no attribute '{name}'") from None
+
+    @classmethod
+    def from_reading(cls, reading, node=None, time=None, sensors=SENSOR_FIELDS):
+        """Build a measurement from a reading dict, defaulting to its own "node" and "time".
+
+        sensors are the sensor names to read, normally every sensor in the node
+        config. Readings without a time are stamped with the current time.
+        Raises ValueError if the time is not an ISO timestamp.
+        """
+        node = node if node is not None else reading.get("node", "Unknown")
+        time = time or reading.get("time") or datetime.now().isoformat()
+        timestamp = datetime.fromisoformat(time).timestamp()
+        extra = {sensor: _to_float(reading.get(sensor)) for sensor in sensors if sensor not in SENSOR_FIELDS}
+        return cls(node, time, timestamp, *(_to_float(reading.get(field)) for field in SENSOR_FIELDS), **extra)
+
+    def to_dict(self):
+        """The reported sensors plus node, time and status (when set), like the original reading dict."""
+        data = {"node": self.node, "time": self.time}
+        for field in SENSOR_FIELDS + tuple(self.extra):
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        if self.status is not None:
+            data["status"] = self.status
+        return data
@@ -0,0 +1,163 @@
+import json
+import threading
+import paho.mqtt.client as mqtt
+
+# Reconnect backoff in seconds (doubles from min to max while the broker is down)
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 30
+
+# Create a paho client that works with both the 1.x and 2.x callback APIs
+def make_client(client_id, username=None, password=None):
+    if hasattr(mqtt, "CallbackAPIVersion"):
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+    else:
+        client = mqtt.Client(client_id=client_id)
+    if username is not None:
+        client.username_pw_set(username, password)
+    client.reconnect_delay_set(min_delay=RECONNECT_MIN_DELAY, max_delay=RECONNECT_MAX_DELAY)
+    return client
+
+# Encode a message the same way mosquitto_pub -m json.dumps(...) did
+def encode_payload(message):
+    if isinstance(message, (str, bytes, bytearray)):
+        return message
+    return json.dumps(message)
+
+# Publish return codes for messages paho keeps queued and sends once the connection is back
+_PENDING_RC = (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN, mqtt.MQTT_ERR_AGAIN)
+
+# True once the broker has acknowledged a published message, or paho gave up on it so it never will be.
+# is_published() raises for messages published while disconnected, so their flag is read directly.
+def publish_done(info):
+    if info.rc not in _PENDING_RC:
+        return True
+    with info._condition:
+        return info._published
+
+
+class MQTTPublisher:
+    """Keeps one authenticated broker connection open for all publishes.
+
+    Messages are handed to the paho network thread, so publish() never blocks
+    on the broker. At most max_inflight QoS 1 messages are unacknowledged at a
+    time and up to max_queued more wait behind them, including while the
+    connection is down and being re-established.
+    """
+
+    def __init__(self, host, port, username=None, password=None, client_id="",
+                 qos=1, max_inflight=20, max_queued=1000, keepalive=60):
+        self.host = host
+        self.port = int(port)
+        self.qos = qos
+        self.keepalive = keepalive
+        self.connected = threading.Event()
+        self._started = False
+        self._start_lock = threading.Lock()
+
+        self._client = make_client(client_id, username, password)
+        self._client.max_inflight_messages_set(max_inflight)
+        self._client.max_queued_messages_set(max_queued)
+        self._client.on_connect = self._on_connect
+        self._client.on_disconnect = self._on_disconnect
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            print(f"Publisher connected to MQTT broker {self.host}:{self.port}")
+            self.connected.set()
+        else:
+            print(f"Publisher failed to connect to MQTT broker: {rc}")
+
+    def _on_disconnect(self, client, userdata, *args):
+        self.connected.clear()
+        print("Publisher lost connection to MQTT broker, reconnecting...")
+
+    # Open the connection and start the background network thread
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            # connect_async lets the network thread keep retrying until the broker is up
+            self._client.connect_async(self.host, self.port, self.keepalive)
+            self._client.loop_start()
+            self._started = True
+
+    def publish(self, topic, message, retain=False):
+        """Queue a message (dicts are sent as JSON) and return the paho MQTTMessageInfo."""
+        if not self._started:
+            self.start()
+        info = self._client.publish(topic, encode_payload(message), qos=self.qos, retain=retain)
+        if info.rc == mqtt.MQTT_ERR_QUEUE_SIZE:
+            print(f"Publish queue full, dropping message on topic {topic}")
+        elif info.rc not in _PENDING_RC:
+            print(f"Publish failed, dropping message on topic {topic}: {mqtt.error_string(info.rc)}")
+        return info
+
+    def stop(self):
+        with self._start_lock:
+            if not self._started:
+                return
+            self._client.disconnect()
+            self._client.loop_stop()
+            self._started = False
+
+
+class MQTTSubscriber:
+    """One broker connection subscribed to (wildcard) topics, dispatching by topic.
+
+    Each message on a topic with a registered handler is passed to it as text,
+    the same as a line read from mosquitto_sub, or as bytes for handlers added
+    with raw=True. Messages on other topics that match the subscription are
+    ignored. Subscriptions are renewed on reconnect.
+    """
+
+    def __init__(self, host, port, username=None, password=None, client_id="",
+                 topics=("#",), qos=0, keepalive=60):
+        self.host = host
+        self.port = int(port)
+        self.topics = list(topics)
+        self.qos = qos
+        self.keepalive = keepalive
+        self.handlers = {}
+
+        self._client = make_client(client_id, username, password)
+        self._client.on_connect = self._on_connect
+        self._client.on_disconnect = self._on_disconnect
+        self._client.on_message = self._on_message
+
+    def add_handler(self, topic, handler, raw=False):
+        self.handlers[topic] = (handler, raw)
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc != 0:
+            print(f"Subscriber failed to connect to MQTT broker: {rc}")
+            return
+        for topic in self.topics:
+            print(f"Listening to topic: {topic}")
+            client.subscribe(topic, qos=self.qos)
+
+    def _on_disconnect(self, client, userdata, *args):
+        print("Subscriber lost connection to MQTT broker, reconnecting...")
+
+    def _on_message(self, client, userdata, msg):
+        entry = self.handlers.get(msg.topic)
+        if entry is None:
+            return
+        handler, raw = entry
+        try:
+            handler(msg.payload if raw else msg.payload.decode("utf-8", errors="replace"))
+        except Exception as e:
+            print(f"Error handling message on topic {msg.topic}: {e}")
+
+    # Start the background network thread
+    def start(self):
+        self._client.connect_async(self.host, self.port, self.keepalive)
+        self._client.loop_start()
+
+    # Run the network loop on the calling thread, retrying until the broker is up
+    def loop_forever(self):
+        self._client.connect_async(self.host, self.port, self.keepalive)
+        self._client.loop_forever(retry_first_connection=True)
+
+    def stop(self):
+        self._client.disconnect()
+        self._client.loop_stop()
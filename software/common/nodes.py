@@ -0,0 +1,127 @@
+import os
+import json
+
+# Ways a node can send its vibration buffer: hex inside the JSON reading (original firmware),
+# or raw bytes / base64 text on the node's separate vibration topic
+VIBRATION_ENCODINGS = ("hex", "binary", "base64")
+
+# Threshold rules a sensor defines and a node may override (see common/rules.py)
+RULE_FIELDS = ("acceptable", "extreme", "disconnected", "warning_margin", "warn_low")
+
+# Node layout used by every script, override with the HACKERFAB_NODES environment variable
+# e.g. HACKERFAB_NODES=/path/to/nodes_no_bme_sc.json python3 master-code.py
+NODE_CONFIG_ENV = "HACKERFAB_NODES"
+DEFAULT_NODE_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "nodes.json")
+
+
+class Sensor:
+    """Display and limit metadata for one kind of sensor reading.
+
+    acceptable is the [min, max] range outside which a reading is bad, extreme
+    the [min, max] hardware limits (either may be null), disconnected the value
+    the node reports when the sensor is unplugged, warning_margin how close to
+    the acceptable range a rising reading triggers an early warning, and
+    warn_low whether falling readings near the minimum warn as well.
+    """
+
+    def __init__(self, name, label=None, unit="", acceptable=None, y_bounds=(0, 1),
+                 extreme=None, disconnected=None, warning_margin=None, warn_low=False):
+        self.name = name
+        self.label = label or name.replace("_", " ").title()
+        self.unit = unit
+        self.acceptable = tuple(acceptable) if acceptable is not None else None
+        self.y_bounds = tuple(y_bounds)
+        self.extreme = tuple(extreme) if extreme is not None else None
+        self.disconnected = disconnected
+        self.warning_margin = warning_margin
+        self.warn_low = warn_low
+
+
+class Node:
+    """One sensor node (station): its topics, frame key, sensors and limits.
+
+    Only name and sensors are required in the config. The frame key, topics,
+    title and GUI colour are derived from the name when they are not given.
+    "rules" may override any of a sensor's threshold rules for this node only,
+    e.g. {"temperature": {"acceptable": [20, 24]}}, and "acceptable" is a
+    shorthand for overriding just the acceptable ranges.
+    Nodes with "vibration_encoding" set to binary or base64 send their vibration
+    buffer on vibration_topic; hex readings in the JSON are still accepted.
+    """
+
+    def __init__(self, name, sensors, sensor_types, title=None, key=None, topic=None,
+                 power_topic=None, color=None, acceptable=None, rules=None,
+                 vibration_encoding="hex", vibration_topic=None):
+        self.name = name
+        self.key = key or f"{name}_data"
+        self.title = title or name
+        self.topic = topic or f"topic/{name}"
+        self.power_topic = power_topic or f"topic/battery{name}"
+        self.color = color
+        self.sensors = tuple(sensors)
+        self.has_vibration = "vibration" in self.sensors
+
+        if vibration_encoding not in VIBRATION_ENCODINGS:
+            raise ValueError(f"Node {name} has unknown vibration encoding '{vibration_encoding}'")
+        self.vibration_encoding = vibration_encoding
+        self.vibration_topic = vibration_topic or f"{self.topic}/vibration"
+
+        for sensor in self.sensors:
+            if sensor not in sensor_types:
+                raise ValueError(f"Node {name} uses unknown sensor '{sensor}'")
+
+        # Threshold rules per sensor type, the sensor defaults with this node's overrides applied
+        self.rules = {}
+        for sensor, sensor_type in sensor_types.items():
+            overrides = dict((rules or {}).get(sensor, {}))
+            if acceptable and sensor in acceptable:
+                overrides.setdefault("acceptable", acceptable[sensor])
+            for field in overrides:
+                if field not in RULE_FIELDS:
+                    raise ValueError(f"Node {name} has unknown rule '{field}' for {sensor}")
+            self.rules[sensor] = {field: overrides.get(field, getattr(sensor_type, field)) for field in RULE_FIELDS}
+
+
+class NodeRegistry:
+    """All nodes from the config, with O(1) lookup by name or frame key."""
+
+    def __init__(self, sensors, nodes, gui=None):
+        self.sensors = sensors
+        self.nodes = list(nodes)
+        self.gui = gui or {}
+        self.by_name = {node.name: node for node in self.nodes}
+        self.by_key = {node.key: node for node in self.nodes}
+        if len(self.by_name) != len(self.nodes):
+            raise ValueError("Node names in the config must be unique")
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def names(self):
+        return [node.name for node in self.nodes]
+
+    # Sensors reported by at least one node, in config order
+    @property
+    def metrics(self):
+        used = {sensor for node in self.nodes for sensor in node.sensors}
+        return [sensor for sensor in self.sensors if sensor in used]
+
+    # Fields each node contributes to an aggregator frame, vibration nodes also send their vibration features
+    def frame_schema(self):
+        return {node.key: node.sensors + ("vibration_features",) if node.has_vibration else node.sensors
+                for node in self.nodes}
+
+
+def load_registry(path=None):
+    """Load the node registry from path, $HACKERFAB_NODES or software/nodes.json."""
+    path = path or os.environ.get(NODE_CONFIG_ENV) or DEFAULT_NODE_CONFIG
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+
+    sensors = {name: Sensor(name, **options) for name, options in config["sensors"].items()}
+    nodes = [Node(sensor_types=sensors, **options) for options in config["nodes"]]
+    return NodeRegistry(sensors, nodes, config.get("gui"))
@@ -0,0 +1,103 @@
+import asyncio
+from collections import deque
+
+# What a full StageQueue does with a new item
+DROP_OLDEST = "drop-oldest"  # Discard the oldest queued item to make room
+COALESCE = "coalesce"        # Replace the queued item with the same key, else drop the oldest
+BLOCK = "block"              # Accept it, and make the producer wait in wait_for_space()
+OVERLOAD_POLICIES = (DROP_OLDEST, COALESCE, BLOCK)
+
+
+class StageQueue:
+    """Bounded queue between two asyncio pipeline stages, with an overload policy.
+
+    put_nowait() never blocks, so it can be called from synchronous code on
+    the event loop (or through loop.call_soon_threadsafe from another thread).
+    With DROP_OLDEST and COALESCE the queue never holds more than maxsize
+    items. With BLOCK it can briefly go over, and the producer applies
+    backpressure by awaiting wait_for_space() before producing more. stats()
+    reports the current depth, the high-water mark and how many items were
+    dropped or coalesced.
+    """
+
+    def __init__(self, name, maxsize=100, policy=DROP_OLDEST, key=None):
+        if policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy '{policy}'")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+        self._items = deque()
+        self._by_key = {}
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self.high_water = 0
+        self.received = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put_nowait(self, item):
+        self.received += 1
+        if self.policy == COALESCE:
+            key = self.key(item)
+            entry = self._by_key.get(key)
+            if entry is not None:
+                entry[1] = item
+                self.coalesced += 1
+                return
+        if self.policy != BLOCK and len(self._items) >= self.maxsize:
+            self._forget(self._items.popleft())
+            self.dropped += 1
+
+        entry = [self.key(item) if self.policy == COALESCE else None, item]
+        self._items.append(entry)
+        if self.policy == COALESCE:
+            self._by_key[entry[0]] = entry
+        self.high_water = max(self.high_water, len(self._items))
+        self._not_empty.set()
+        if len(self._items) >= self.maxsize:
+            self._not_full.clear()
+
+    async def get(self):
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self._take()
+
+    # Everything queued right now, without waiting
+    def drain(self):
+        items = []
+        while self._items:
+            items.append(self._take())
+        return items
+
+    async def wait_for_space(self):
+        while len(self._items) >= self.maxsize:
+            self._not_full.clear()
+            await self._not_full.wait()
+
+    def stats(self):
+        return {
+            "depth": len(self._items),
+            "max_size": self.maxsize,
+            "high_water": self.high_water,
+            "received": self.received,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "policy": self.policy,
+        }
+
+    def _take(self):
+        entry = self._items.popleft()
+        self._forget(entry)
+        if len(self._items) < self.maxsize:
+            self._not_full.set()
+        return entry[1]
+
+    def _forget(self, entry):
+        if self.policy == COALESCE and self._by_key.get(entry[0]) is entry:
+            del self._by_key[entry[0]]
@@ -0,0 +1,100 @@
+# Rollup resolutions in seconds, finest first: 1 minute and 1 hour
+ROLLUP_RESOLUTIONS = (60, 60 * 60)
+
+# Column order of a rollup row, as stored in the rollups table
+ROLLUP_COLUMNS = ("node", "sensor", "resolution", "start", "count", "min", "max", "mean")
+
+
+class Rollup:
+    """Count, sum, min and max of the readings in one time bucket."""
+
+    __slots__ = ("start", "count", "total", "min", "max")
+
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def row(self, node, sensor, resolution):
+        return (node, sensor, resolution, self.start, self.count, self.min, self.max, self.total / self.count)
+
+
+class RollupAggregator:
+    """Min, max, mean and count of every node's sensors per minute and per hour.
+
+    Each reading is added to its node and sensor's open minute bucket, which is
+    O(1). When a reading starts a new minute the finished minute is returned
+    as a row and merged into its hour, and a finished hour is returned the
+    same way, so the coarser resolutions cost nothing per reading. Readings
+    for a bucket that has already been closed are counted in late and skipped.
+    """
+
+    def __init__(self, sensors, resolutions=ROLLUP_RESOLUTIONS):
+        self.sensors = tuple(sensors)
+        self.resolutions = tuple(sorted(resolutions))
+        self.late = 0
+        self._open = {}
+
+    def update(self, node, timestamp, readings):
+        """Add one measurement (any object with an attribute per sensor), returning the rows it completed."""
+        completed = []
+        start = timestamp - timestamp % self.resolutions[0]
+        for sensor in self.sensors:
+            value = getattr(readings, sensor, None)
+            if not isinstance(value, (int, float)) or value != value:
+                continue  # Missing, not numeric or NaN
+            buckets = self._open.get((node, sensor))
+            if buckets is None:
+                buckets = self._open[(node, sensor)] = [None] * len(self.resolutions)
+            bucket = buckets[0]
+            if bucket is not None and start < bucket.start:
+                self.late += 1
+                continue
+            if bucket is None or start > bucket.start:
+                if bucket is not None:
+                    self._close(node, sensor, buckets, 0, completed)
+                bucket = buckets[0] = Rollup(start)
+            bucket.add(value)
+        return completed
+
+    def drain(self):
+        """Rows of every bucket still open, e.g. at shutdown. Their buckets start over empty."""
+        completed = []
+        for (node, sensor), buckets in self._open.items():
+            for level in range(len(buckets)):
+                if buckets[level] is not None:
+                    self._close(node, sensor, buckets, level, completed)
+        self._open = {}
+        return completed
+
+    # Emit a finished bucket and merge it into the next coarser one
+    def _close(self, node, sensor, buckets, level, completed):
+        rollup = buckets[level]
+        buckets[level] = None
+        completed.append(rollup.row(node, sensor, self.resolutions[level]))
+        if level + 1 == len(self.resolutions):
+            return
+        start = rollup.start - rollup.start % self.resolutions[level + 1]
+        parent = buckets[level + 1]
+        if parent is not None and start > parent.start:
+            self._close(node, sensor, buckets, level + 1, completed)
+            parent = None
+        if parent is None:
+            parent = buckets[level + 1] = Rollup(start)
+        parent.merge(rollup)
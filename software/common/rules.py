@@ -0,0 +1,96 @@
+import numpy as np
+
+from common.nodes import RULE_FIELDS
+
+
+class RuleResults:
+    """Outcome of checking a batch of measurements, one row per measurement.
+
+    Every attribute is a (measurements, sensors) boolean array with columns in
+    RuleTable.sensors order, except values which holds the readings (NaN where
+    a sensor was not reported or was not numeric) and rows, the RuleTable row
+    each measurement was checked against.
+    """
+
+    def __init__(self, rows, values, invalid, out_of_range, above_extreme, below_extreme, disconnected,
+                 near_high, near_low):
+        self.rows = rows
+        self.values = values
+        self.invalid = invalid
+        self.out_of_range = out_of_range
+        self.above_extreme = above_extreme
+        self.below_extreme = below_extreme
+        self.disconnected = disconnected
+        self.near_high = near_high
+        self.near_low = near_low
+
+
+class RuleTable:
+    """Threshold rules for every node and sensor, compiled into (nodes, sensors) arrays.
+
+    The rules come from the node config: each sensor's acceptable range,
+    extreme hardware limits, disconnect sentinel and early-warning margin, with
+    any per-node overrides applied. Missing limits become +/-inf and missing
+    sentinels or margins NaN, so they never match. check() evaluates all of
+    them for a whole frame with a handful of array comparisons. Measurements
+    from nodes that are not in the config use the sensor defaults.
+    """
+
+    def __init__(self, registry):
+        self.sensors = tuple(registry.sensors)
+        self.sensor_types = registry.sensors
+        self.node_rows = {node.name: i for i, node in enumerate(registry)}
+        self.default_row = len(registry)
+
+        rules = [node.rules for node in registry]
+        rules.append({name: {field: getattr(sensor, field) for field in RULE_FIELDS}
+                      for name, sensor in registry.sensors.items()})
+
+        def column(field, index, missing):
+            return np.array([[self._bound(rule[sensor][field], index, missing) for sensor in self.sensors]
+                             for rule in rules], dtype=float)
+
+        self.acceptable_min = column("acceptable", 0, -np.inf)
+        self.acceptable_max = column("acceptable", 1, np.inf)
+        self.extreme_min = column("extreme", 0, -np.inf)
+        self.extreme_max = column("extreme", 1, np.inf)
+        self.disconnected = column("disconnected", None, np.nan)
+        margin = column("warning_margin", None, np.nan)
+        warn_low = np.array([[bool(rule[sensor]["warn_low"]) for sensor in self.sensors] for rule in rules])
+
+        # Early warnings fire for readings at or beyond these levels
+        self.warn_high = self.acceptable_max - margin
+        self.warn_low = np.where(warn_low, self.acceptable_min + margin, np.nan)
+
+    @staticmethod
+    def _bound(value, index, missing):
+        if index is not None:
+            value = value[index] if value is not None else None
+        return missing if value is None else value
+
+    def check(self, measurements):
+        """Evaluate every rule for a list of measurements in one pass."""
+        rows = np.array([self.node_rows.get(m.node, self.default_row) for m in measurements], dtype=int)
+        values = np.full((len(measurements), len(self.sensors)), np.nan)
+        invalid = np.zeros(values.shape, dtype=bool)
+        for i, m in enumerate(measurements):
+            for j, sensor in enumerate(self.sensors):
+                value = getattr(m, sensor, None)
+                if isinstance(value, (int, float)):
+                    values[i, j] = value
+                elif value is not None:
+                    invalid[i, j] = True
+
+        present = ~np.isnan(values)
+        with np.errstate(invalid="ignore"):
+            return RuleResults(
+                rows=rows,
+                values=values,
+                invalid=invalid,
+                out_of_range=present & ((values < self.acceptable_min[rows]) | (values > self.acceptable_max[rows])),
+                above_extreme=values >= self.extreme_max[rows],
+                below_extreme=values <= self.extreme_min[rows],
+                disconnected=values == self.disconnected[rows],
+                near_high=values >= self.warn_high[rows],
+                near_low=values <= self.warn_low[rows],
+            )
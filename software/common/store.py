@@ -0,0 +1,83 @@
+import os
+import csv
+import time
+import threading
+
+# Column headings of the measurement CSVs exported by save_data.py
+MEASUREMENT_HEADER = ["Node", "Temperature (°C)", "Humidity (%)", "Ambient Light (lux)",
+                      "Particle Count", "Vibration", "Timestamp"]
+
+# Local start time in the names of time-segmented files such as the waveform archive
+SEGMENT_TIME_FORMAT = "%Y%m%dT%H%M%S"
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+class BufferedCSVWriter:
+    """Long-lived buffered CSV log file, kept open for the life of the process.
+
+    Rows are flushed to the OS every flush_interval seconds or after
+    flush_rows unflushed rows, whichever comes first. Rows written with
+    alarm=True are flushed straight away, and also fsynced to the SD card when
+    fsync_on_alarm is set. With truncate the file is started over with just the
+    header, otherwise rows are appended and the header is only written to an
+    empty file.
+    """
+
+    def __init__(self, path, header=None, flush_interval=DEFAULT_FLUSH_INTERVAL, flush_rows=100,
+                 fsync_on_alarm=False, truncate=False, clock=time.time):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.fsync_on_alarm = fsync_on_alarm
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_flush = clock()
+
+        new_file = truncate or not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, mode='w' if truncate else 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if new_file and header is not None:
+            self._writer.writerow(header)
+            self._file.flush()
+
+    def write(self, row, alarm=False):
+        self.writerows([row], alarm=alarm)
+
+    def writerows(self, rows, alarm=False):
+        with self._lock:
+            if self._file is None:
+                raise ValueError(f"{self.path} is closed")
+            for row in rows:
+                self._writer.writerow(row)
+                self._pending += 1
+            if alarm:
+                self._flush(sync=self.fsync_on_alarm)
+            elif self._pending >= self.flush_rows or self.clock() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self, sync=False):
+        with self._lock:
+            self._flush(sync)
+
+    # Flush rows that have been waiting longer than flush_interval
+    def poll(self):
+        with self._lock:
+            if self._pending and self.clock() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+                self._file.close()
+                self._file = None
+
+    def _flush(self, sync=False):
+        if self._file is None:
+            return
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_flush = self.clock()
@@ -0,0 +1,58 @@
+# Number of consecutive readings that must move the same way to count as a trend
+DEFAULT_TREND_LENGTH = 3
+
+RISING = 1
+FALLING = -1
+FLAT = 0
+
+
+class SensorTrend:
+    """Strictly rising or falling run of one sensor's readings, updated in O(1).
+
+    Only the previous value and the lengths of the current rising and falling
+    runs are kept. A missing or non-numeric reading breaks both runs, the same
+    as when it appeared in the last readings compared by the old check.
+    """
+
+    __slots__ = ("length", "last", "rising", "falling")
+
+    def __init__(self, length=DEFAULT_TREND_LENGTH):
+        self.length = length
+        self.last = None
+        self.rising = 0
+        self.falling = 0
+
+    def update(self, value):
+        """Add the next reading and return RISING, FALLING or FLAT over the last `length` readings."""
+        if not isinstance(value, (int, float)):
+            self.last = None
+            self.rising = self.falling = 0
+            return FLAT
+        last = self.last
+        self.rising = self.rising + 1 if last is not None and value > last else 1
+        self.falling = self.falling + 1 if last is not None and value < last else 1
+        self.last = value
+        if self.rising >= self.length:
+            return RISING
+        if self.falling >= self.length:
+            return FALLING
+        return FLAT
+
+
+class TrendDetector:
+    """Per node and sensor trend state for the early-warning check."""
+
+    def __init__(self, sensors, length=DEFAULT_TREND_LENGTH):
+        self.sensors = tuple(sensors)
+        self.length = length
+        self._trends = {}
+
+    def update(self, node_id, readings):
+        """Feed one node's readings (any object with an attribute per sensor).
+
+        Returns a dict of sensor -> RISING, FALLING or FLAT.
+        """
+        trends = self._trends.get(node_id)
+        if trends is None:
+            trends = self._trends[node_id] = {sensor: SensorTrend(self.length) for sensor in self.sensors}
+        return {sensor: trends[sensor].update(getattr(readings, sensor, None)) for sensor in self.sensors}
@@ -0,0 +1,157 @@
+import re
+import time
+import base64
+from functools import lru_cache
+import numpy as np
+import scipy.signal as signal
+
+# ADXL355 buffer layout: each sample is 9 bytes, 3 per axis (X, Y, Z)
+# Each axis is a 20-bit two's complement value left aligned in 3 bytes
+SAMPLE_BYTES = 9
+COUNTS_PER_G = 64000
+
+# Sampling rate of the vibration buffers and high-pass cutoff used to remove gravity
+SAMPLE_RATE = 500
+HIGH_PASS_CUTOFF = 1
+
+_NON_HEX = re.compile(r'[^0-9A-Fa-f]')
+
+# Convert a hex string from the sensor node into raw bytes
+# Nulls and any other non-hex characters are dropped, like the old regex parser
+def hex_to_bytes(hex_string):
+    hex_string = hex_string.replace("\x00", "")
+    try:
+        return bytes.fromhex(hex_string)
+    except ValueError:
+        hex_string = _NON_HEX.sub('', hex_string)
+        return bytes.fromhex(hex_string[:len(hex_string) - len(hex_string) % 2])
+
+# Convert raw bytes into signed 20-bit counts, shape (N, 3)
+# Trailing bytes that do not make a full sample are ignored
+def decode_counts(raw):
+    num_readings = len(raw) // SAMPLE_BYTES
+    samples = np.frombuffer(raw, dtype=np.uint8, count=num_readings * SAMPLE_BYTES)
+    samples = samples.reshape(num_readings, 3, 3).astype(np.int32)
+    counts = (samples[:, :, 0] << 12) | (samples[:, :, 1] << 4) | (samples[:, :, 2] >> 4)
+    # Sign extend from bit 19
+    return (counts ^ 0x80000) - 0x80000
+
+# Convert a compact vibration payload into raw sensor bytes
+# "binary" payloads already are the raw bytes, "base64" payloads are those bytes base64 encoded
+def compact_to_bytes(payload, encoding="binary"):
+    return base64.b64decode(payload) if encoding == "base64" else bytes(payload)
+
+# The node sends all 0xFF bytes (all 'F' in hex) when the ADXL read failed
+def is_error_buffer(raw):
+    return len(raw) > 0 and raw.count(0xFF) == len(raw)
+
+def decode_hex_buffers(hex_strings):
+    """Decode many hex buffers (from any number of nodes) in one pass.
+
+    Returns a list of (N, 3) arrays in g, one per input buffer, in order.
+    """
+    chunks = []
+    lengths = []
+    for hex_string in hex_strings:
+        raw = hex_to_bytes(hex_string)
+        num_readings = len(raw) // SAMPLE_BYTES
+        chunks.append(raw[:num_readings * SAMPLE_BYTES])
+        lengths.append(num_readings)
+    if not lengths:
+        return []
+    accel = decode_counts(b"".join(chunks)) / COUNTS_PER_G
+    return np.split(accel, np.cumsum(lengths)[:-1])
+
+# Design the high-pass filter once per parameter set, in second-order sections
+@lru_cache(maxsize=None)
+def high_pass_sos(cutoff=HIGH_PASS_CUTOFF, fs=SAMPLE_RATE, order=1):
+    return signal.butter(order, cutoff / (fs / 2), btype='high', output='sos')
+
+
+class StreamingHighPass:
+    """High-pass filter for one node's consecutive vibration buffers.
+
+    The filter state is carried from one buffer to the next, so only the first
+    buffer (or the first after a gap longer than max_gap seconds) starts cold.
+    A cold start is initialised to the steady state of its first sample, which
+    keeps the gravity step from ringing through the buffer.
+    """
+
+    def __init__(self, cutoff=HIGH_PASS_CUTOFF, fs=SAMPLE_RATE, order=1, max_gap=5):
+        self.sos = high_pass_sos(cutoff, fs, order)
+        self.max_gap = max_gap
+        self._zi = None
+        self._last_time = None
+
+    def reset(self):
+        self._zi = None
+        self._last_time = None
+
+    def process(self, accel_data, now=None):
+        """Filter an (N, 3) buffer along the sample axis and return the result."""
+        now = time.monotonic() if now is None else now
+        if self._last_time is not None and now - self._last_time > self.max_gap:
+            self.reset()
+        self._last_time = now
+
+        if len(accel_data) == 0:
+            return accel_data
+        if self._zi is None:
+            self._zi = signal.sosfilt_zi(self.sos)[:, :, np.newaxis] * accel_data[0]
+        filtered, self._zi = signal.sosfilt(self.sos, accel_data, axis=0, zi=self._zi)
+        return filtered
+
+# Frequency bands (Hz) reported as band energies, the last band runs up to the Nyquist frequency
+FEATURE_BANDS = ((1, 10), (10, 50), (50, 100), (100, SAMPLE_RATE / 2))
+
+
+class VibrationFeatures:
+    """Per-axis features of a filtered (N, 3) vibration buffer, computed in one pass.
+
+    Reports RMS, peak, crest factor, dominant frequency and the energy in each
+    of the FEATURE_BANDS (mean square in g^2, so the bands sum to about RMS^2).
+    The FFT window, frequency bins and band masks are built once per buffer
+    length and reused.
+    """
+
+    def __init__(self, fs=SAMPLE_RATE, bands=FEATURE_BANDS):
+        self.fs = fs
+        self.bands = tuple(bands)
+        self.band_names = [f"{low:g}-{high:g}Hz" for low, high in self.bands]
+        self._cache = {}
+
+    def _spectrum_setup(self, num_samples):
+        setup = self._cache.get(num_samples)
+        if setup is None:
+            window = np.hanning(num_samples)
+            freqs = np.fft.rfftfreq(num_samples, d=1 / self.fs)
+            masks = np.array([(freqs >= low) & (freqs < high) if high < self.fs / 2 else (freqs >= low)
+                              for low, high in self.bands], dtype=float)
+            # Scale one-sided |FFT|^2 of the windowed buffer to mean square contributions
+            scale = 2 / (num_samples * np.sum(window ** 2))
+            setup = (window[:, np.newaxis], freqs, masks * scale)
+            self._cache[num_samples] = setup
+        return setup
+
+    def compute(self, filtered, decimals=4):
+        """Return a dict of per-axis [x, y, z] feature lists, ready to publish as JSON."""
+        if len(filtered) < 2:
+            return {}
+        window, freqs, band_weights = self._spectrum_setup(len(filtered))
+
+        rms = np.sqrt(np.mean(filtered ** 2, axis=0))
+        peak = np.max(np.abs(filtered), axis=0)
+        crest = np.divide(peak, rms, out=np.zeros_like(peak), where=rms > 0)
+
+        power = np.abs(np.fft.rfft(filtered * window, axis=0)) ** 2
+        dominant = freqs[1 + np.argmax(power[1:], axis=0)]  # Skip the DC bin
+        band_energy = band_weights @ power
+
+        return {
+            "rms": np.round(rms, decimals).tolist(),
+            "peak": np.round(peak, decimals).tolist(),
+            "crest_factor": np.round(crest, decimals).tolist(),
+            "dominant_freq": np.round(dominant, 2).tolist(),
+            "band_energy": {name: np.round(energy, decimals + 2).tolist()
+                            for name, energy in zip(self.band_names, band_energy)},
+        }
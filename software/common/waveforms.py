@@ -0,0 +1,221 @@
+import os
+import lzma
+import zlib
+import time
+import struct
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+import numpy as np
+
+from common.store import SEGMENT_TIME_FORMAT
+
+# Compression of each archived buffer
+ZLIB = "zlib"
+LZMA = "lzma"
+CODECS = (ZLIB, LZMA)
+
+# Segment files are named waveforms-<local start time>.bin, each with an index next to it (.idx)
+WAVEFORMS_PREFIX = "waveforms"
+DEFAULT_SEGMENT_SECONDS = 60 * 60
+
+# One index record per buffer: node, epoch timestamp, offset and length of the compressed
+# block in the segment, number of samples and codec
+_INDEX_RECORD = struct.Struct("<16sdQIIB")
+_NODE_BYTES = 16
+
+
+def _encode(counts, codec, level):
+    """(N, 3) int32 counts -> compressed per-axis deltas.
+
+    The deltas are small, so most of their high bytes are 0 or 0xFF. Storing
+    each byte of the int32s as its own plane puts those runs together, which
+    zlib compresses about a third smaller.
+    """
+    deltas = np.ascontiguousarray(np.diff(np.asarray(counts, dtype=np.int32).T, axis=1, prepend=0), dtype="<i4")
+    data = deltas.view(np.uint8).reshape(-1, 4).T.tobytes()
+    if codec == LZMA:
+        return lzma.compress(data, preset=level if level is not None else 6)
+    return zlib.compress(data, level if level is not None else 6)
+
+
+def _decode(block, samples, codec):
+    data = lzma.decompress(block) if codec == LZMA else zlib.decompress(block)
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(4, -1)
+    deltas = np.ascontiguousarray(planes.T).view("<i4").reshape(3, samples)
+    return np.cumsum(deltas, axis=1, dtype=np.int32).T
+
+
+class WaveformEntry:
+    """Where one archived buffer is stored."""
+
+    __slots__ = ("node", "timestamp", "path", "offset", "length", "samples", "codec")
+
+    def __init__(self, node, timestamp, path, offset, length, samples, codec):
+        self.node = node
+        self.timestamp = timestamp
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.samples = samples
+        self.codec = codec
+
+
+class WaveformArchive:
+    """Append-only archive of decoded ADXL buffers.
+
+    Each buffer is stored as the int32 deltas of its counts along every axis,
+    split into byte planes, compressed on its own with zlib or lzma and
+    appended to the segment file covering its timestamp. The block's
+    (node, timestamp) -> offset record is appended to the segment's index
+    after the block, so a crash can leave an unindexed block but never an
+    index record pointing past the data. Segments that ended more than
+    retention seconds ago are deleted when the archive rotates.
+    """
+
+    def __init__(self, directory, codec=ZLIB, level=None, segment_seconds=DEFAULT_SEGMENT_SECONDS,
+                 retention=None, clock=time.time):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown waveform codec '{codec}'")
+        self.directory = directory
+        self.codec = codec
+        self.level = level
+        self.segment_seconds = segment_seconds
+        self.retention = retention
+        self.clock = clock
+        self._data = None
+        self._index = None
+        self._segment_start = None
+        self._lock = threading.Lock()
+
+    def append(self, node, timestamp, counts):
+        """Archive one (N, 3) buffer of raw counts, returning the size of the compressed block."""
+        block = _encode(counts, self.codec, self.level)
+        record = [node.encode()[:_NODE_BYTES], timestamp, 0, len(block), len(counts), CODECS.index(self.codec)]
+        start = timestamp - timestamp % self.segment_seconds
+        with self._lock:
+            if self._segment_start is None or start > self._segment_start:
+                self._rotate(start)
+            record[2] = self._data.tell()
+            self._data.write(block)
+            self._data.flush()
+            self._index.write(_INDEX_RECORD.pack(*record))
+            self._index.flush()
+        return len(block)
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        for f in (self._data, self._index):
+            if f is not None:
+                f.close()
+        self._data = self._index = None
+
+    def _rotate(self, start):
+        self._close()
+        os.makedirs(self.directory, exist_ok=True)
+        data_path, index_path = segment_paths(self.directory, start)
+        self._data = open(data_path, "ab")
+        self._index = open(index_path, "ab")
+        # Drop a record a crash cut short, so later records stay aligned
+        size = self._index.tell()
+        if size % _INDEX_RECORD.size:
+            self._index.truncate(size - size % _INDEX_RECORD.size)
+        self._segment_start = start
+        if self.retention is not None:
+            cutoff = self.clock() - self.retention
+            for segment_start, data_path, index_path in list_waveform_segments(self.directory):
+                if segment_start + self.segment_seconds < cutoff:
+                    for path in (data_path, index_path):
+                        try:
+                            os.remove(path)
+                        except OSError as e:
+                            print(f"Could not remove old waveform segment {path}: {e}")
+
+
+def segment_paths(directory, start):
+    name = f"{WAVEFORMS_PREFIX}-{datetime.fromtimestamp(start).strftime(SEGMENT_TIME_FORMAT)}"
+    return os.path.join(directory, f"{name}.bin"), os.path.join(directory, f"{name}.idx")
+
+
+def list_waveform_segments(directory):
+    """(start epoch, data path, index path) of every segment, oldest first."""
+    segments = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return segments
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        if ext != ".idx" or not stem.startswith(WAVEFORMS_PREFIX + "-"):
+            continue
+        try:
+            start = datetime.strptime(stem[len(WAVEFORMS_PREFIX) + 1:], SEGMENT_TIME_FORMAT).timestamp()
+        except ValueError:
+            continue
+        segments.append((start, os.path.join(directory, stem + ".bin"), os.path.join(directory, name)))
+    segments.sort()
+    return segments
+
+
+class WaveformReader:
+    """Random access to the buffers in a WaveformArchive directory.
+
+    The index files are read into memory once (refresh() picks up buffers
+    archived since), after which reading any buffer is one seek, one read and
+    one decompress of its block.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._entries = {}
+        self._times = {}
+        self._read = {}
+        self.refresh()
+
+    def refresh(self):
+        changed = set()
+        for _, data_path, index_path in list_waveform_segments(self.directory):
+            offset = self._read.get(index_path, 0)
+            try:
+                with open(index_path, "rb") as f:
+                    f.seek(offset)
+                    records = f.read()
+            except FileNotFoundError:
+                continue
+            usable = len(records) - len(records) % _INDEX_RECORD.size
+            self._read[index_path] = offset + usable
+            for node, timestamp, block_offset, length, samples, codec in _INDEX_RECORD.iter_unpack(records[:usable]):
+                node = node.rstrip(b"\0").decode()
+                entry = WaveformEntry(node, timestamp, data_path, block_offset, length, samples, CODECS[codec])
+                self._entries.setdefault(node, []).append(entry)
+                changed.add(node)
+        for node in changed:
+            self._entries[node].sort(key=lambda entry: entry.timestamp)
+            self._times[node] = [entry.timestamp for entry in self._entries[node]]
+
+    def nodes(self):
+        return sorted(self._entries)
+
+    def entries(self, node, start=None, end=None):
+        """Archived buffers of node with start <= timestamp <= end (epoch seconds), oldest first."""
+        times = self._times.get(node, [])
+        first = bisect_left(times, start) if start is not None else 0
+        last = bisect_right(times, end) if end is not None else len(times)
+        return self._entries.get(node, [])[first:last]
+
+    def find(self, node, timestamp):
+        """The buffer of node archived at or just before timestamp, or None."""
+        times = self._times.get(node, [])
+        i = bisect_right(times, timestamp)
+        return self._entries[node][i - 1] if i else None
+
+    def read(self, entry):
+        """The (N, 3) int32 counts of an archived buffer, divide by COUNTS_PER_G for g."""
+        with open(entry.path, "rb") as f:
+            f.seek(entry.offset)
+            block = f.read(entry.length)
+        return _decode(block, entry.samples, entry.codec)
@@ -0,0 +1,25 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class KeyedExecutor:
+    """Thread pool where all work submitted for one key runs in order on one worker.
+
+    Vibration processing keeps per-node filter state, so buffers from the same
+    node must be handled one after another, while different nodes can be
+    processed in parallel (NumPy and SciPy release the GIL for the heavy parts).
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, name="worker"):
+        self._workers = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-{i}")
+                         for i in range(max_workers)]
+
+    def submit(self, key, fn, *args, **kwargs):
+        worker = self._workers[hash(key) % len(self._workers)]
+        return worker.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        for worker in self._workers:
+            worker.shutdown(wait=wait)
@@ -4,11 +4,16 @@ import signal
 import sys
 import os
 
+# Optional node config, e.g. python3 master-code.py software/nodes_no_bme_sc.json
+# Passed to every child script through the HACKERFAB_NODES environment variable.
+if len(sys.argv) > 1:
+    os.environ["HACKERFAB_NODES"] = os.path.abspath(sys.argv[1])
+
 # Dictionary of script names and their corresponding commands.
 scripts = {
     "aggregator": "python3 /home/admin/Documents/capstone-project-software/software/Formatting/aggregator2.py",
     "analyzer":   "python3 /home/admin/Documents/capstone-project-software/software/testing/analysis.py",
-    "gui": f"python3 /home/admin/Documents/capstone-project-software/software/GUI/GUIv11.py {os.getpid()}"
+    "gui": f"python3 /home/admin/Documents/capstone-project-software/software/GUI/GUIv12.py {os.getpid()}"
 }
 
 # Dictionary to hold the running process objects.
@@ -1,110 +1,220 @@
-import csv
+import os
+import sys
 import time
+import atexit
+import signal
 import socket
-from datetime import datetime, timedelta
-import subprocess
+import asyncio
+from datetime import datetime
 import json
-from threading import Thread
+from collections import deque
+from threading import Thread, Lock
+import numpy as np
+
+# Make the shared modules in software/common importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.archive import ColumnarArchive
+from common.context import Episode, PostErrorWindows, CONTEXT_HEADER
+from common.database import MeasurementDatabase, MEASUREMENTS_DB
+from common.measurements import Measurement
+from common.mqtt_client import MQTTPublisher, MQTTSubscriber, publish_done
+from common.nodes import load_registry
+from common.pipeline import StageQueue, DROP_OLDEST, COALESCE, BLOCK
+from common.rollups import RollupAggregator
+from common.rules import RuleTable
+from common.trends import TrendDetector, RISING, FALLING
+from common.store import BufferedCSVWriter
 
 # MQTT Configuration
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1337
 MQTT_USERNAME = "hackerfab2025"
 MQTT_PASSWORD = "osu2025"
-OUTPUT_TOPIC = "analysis/results"
 INPUT_TOPIC = "reading/formatted"
+# Results carry plain numbers, their units and display names are published once (retained) on SCHEMA_TOPIC
+RESULTS_TOPIC = "analysis/v2/results"
+SCHEMA_TOPIC = "analysis/v2/schema"
+SCHEMA_VERSION = 2
+# Also publish the old results with unit-suffixed strings such as "23.4 °C", for clients that still read them
+PUBLISH_V1_RESULTS = False
+OUTPUT_TOPIC = "analysis/results"
+METRICS_TOPIC = "analysis/metrics"
+
+# Analysis runs as asyncio stages (ingest -> analyze -> persist and publish) joined by bounded queues.
+# When analysis falls behind the oldest frames are dropped, when the disk falls behind analysis waits
+# for it, and when the broker falls behind only the newest result per topic and node is kept.
+INGEST_QUEUE_SIZE = 100
+PERSIST_QUEUE_SIZE = 1000
+PUBLISH_QUEUE_SIZE = 100
+METRICS_INTERVAL = 10  # Seconds between queue-depth reports on METRICS_TOPIC
+# Results handed to paho and not yet acknowledged by the broker. Only then is the next one taken from
+# the publish queue, so while the broker is slow or down the backlog coalesces there instead of in paho.
+PUBLISH_INFLIGHT = 20
+PUBLISH_POLL_INTERVAL = 0.05  # Seconds between checks while the window is full or the broker is down
+
+# Created inside the event loop by run_pipeline, until then writes and publishes happen inline
+ingest_queue = None
+persist_queue = None
+publish_queue = None
 
-# Acceptable Ranges 
-acceptable_temp_range = (18, 30)     # Temperature in °C
-acceptable_humid_range = (25, 70)      # Humidity in %
-acceptable_light_range = (0, 30)       # Ambient light in lux
-acceptable_particle_range = (0, 100)   # Particle count
+# Nodes, their sensors and threshold rules come from the node config (software/nodes.json)
+nodes = load_registry()
 
-# Vibration limits
-VIBRATION_MIN = -0.5
-VIBRATION_MAX = 0.5
+# Acceptable ranges, sensor extreme values, disconnect sentinels and warning margins for every node
+rules = RuleTable(nodes)
 
-# Sensor extreme values
-BME280_TEMP_MAX = 85    
-BME280_TEMP_MIN = -40   
-HUMIDITY_MAX = 100      
-HUMIDITY_MIN = 0        
-VEML7700_MAX_LIGHT = 120000
-IH_PMC_001_MAX = 1000   
+# Measurements are inserted in batches into an SQLite database in this directory, query it with
+# common.database.query_measurements
+MEASUREMENTS_DIR = "measurements"
+MEASUREMENTS_DB_PATH = os.path.join(MEASUREMENTS_DIR, MEASUREMENTS_DB)
+MEASUREMENT_RETENTION = 7 * 24 * 60 * 60  # Context views of past episodes are rebuilt from here
+# Months of history as one float column per node, sensor and day, read it with common.archive.scan_column
+ARCHIVE_DIR = "archive"
 
 # CSV Files
-CSV_FILE = "measurements.csv"
 OUT_OF_RANGE_FILE = "out_of_range.csv"
+# One row per excursion episode, rebuild its context rows with common.context.context_view
 CONTEXT_FILE = "context_data.csv"
 
-# Global in-memory cache for 5-hour measurements.
-measurements_cache = []
+# How the out-of-range and context logs reach the disk: rows are flushed every LOG_FLUSH_INTERVAL
+# seconds or LOG_FLUSH_ROWS rows, out-of-range rows are flushed at once and also fsynced with LOG_FSYNC_ON_ALARM
+LOG_FLUSH_INTERVAL = 1.0
+LOG_FLUSH_ROWS = 100
+LOG_FSYNC_ON_ALARM = False
+
+# Seconds of readings before and after an excursion that make up its context
+CONTEXT_WINDOW = 300
+
+# Excursion episode currently open for each node
+open_episodes = {}
+
+# Early warnings fire when this many consecutive readings of a sensor rise (or fall) to within
+# its warning margin of the acceptable range
+TREND_LENGTH = 3
+
+# Trend state per node and sensor, updated once per measurement
+trend_detector = TrendDetector(rules.sensors, length=TREND_LENGTH)
+
+# Nodes still inside the 5-minute window after their latest error.
+fiveminbuff = PostErrorWindows()
 
-# Global list to store error events in a 5-minute buffer.
-fiveminbuff = []
+# Guards open_episodes, fiveminbuff and latest_measurement, episodes are closed by the analysis stage
+# and the flush thread
+episodes_lock = Lock()
+
+# Newest measurement timestamp seen and the time.monotonic() it arrived at
+latest_measurement = (float("-inf"), 0.0)
+
+# Remove and return the episodes whose post-error window ended before now, a measurement timestamp.
+# Without one, now is the newest timestamp seen plus the time since it arrived, so readings stamped
+# in the past (replays, nodes sending their own time) are not closed early by the wall clock.
+def expire_episodes(now=None):
+    global latest_measurement
+    with episodes_lock:
+        if now is None:
+            newest, arrived = latest_measurement
+            now = newest + time.monotonic() - arrived
+        elif now >= latest_measurement[0]:
+            latest_measurement = (now, time.monotonic())
+        expired = [open_episodes.pop(node, None) for node in fiveminbuff.expire(now)]
+    return [episode for episode in expired if episode is not None]
 
 def safe_str(val):
     return str(val) if val is not None else ""
 
+# Node, sensor values and timestamp columns shared by every CSV
+def measurement_row(m):
+    return [
+        safe_str(m.node),
+        safe_str(m.temperature),
+        safe_str(m.humidity),
+        safe_str(m.ambient_light),
+        safe_str(m.particle_count),
+        safe_str(m.vibration),
+        safe_str(m.time)
+    ]
+
+# Log files stay open for the life of the process, opened by initialize_csv
+out_of_range_log = None
+context_log = None
+
 def initialize_csv():
-    with open(CSV_FILE, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Node", "Temperature (°C)", "Humidity (%)", "Ambient Light (lux)",
-                         "Particle Count", "Vibration", "Timestamp", "Context"])
-    with open(OUT_OF_RANGE_FILE, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Node", "Temperature (°C)", "Humidity (%)", "Ambient Light (lux)",
-                         "Particle Count", "Vibration", "Timestamp", "Reason", "Context"])
-    with open(CONTEXT_FILE, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Node", "Temperature (°C)", "Humidity (%)", "Ambient Light (lux)",
-                         "Particle Count", "Vibration", "Timestamp", "Context Type"])
-
-def update_csv_file():
-    sorted_measurements = sorted(measurements_cache, key=lambda m: datetime.fromisoformat(m['time']), reverse=True)
-    with open(CSV_FILE, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Node", "Temperature (°C)", "Humidity (%)", "Ambient Light (lux)",
-                         "Particle Count", "Vibration", "Timestamp"])
-        for m in sorted_measurements:
-            writer.writerow([
-                safe_str(m.get("node")),
-                safe_str(m.get("temperature")),
-                safe_str(m.get("humidity")),
-                safe_str(m.get("ambient_light")),
-                safe_str(m.get("particle_count")),
-                safe_str(m.get("vibration")),
-                safe_str(m.get("time"))
-            ])
+    global out_of_range_log, context_log
+    out_of_range_log = BufferedCSVWriter(OUT_OF_RANGE_FILE, ["Node", "Temperature (°C)", "Humidity (%)", "Ambient Light (lux)",
+                                         "Particle Count", "Vibration", "Timestamp", "Reason", "Context"],
+                                         flush_interval=LOG_FLUSH_INTERVAL, flush_rows=LOG_FLUSH_ROWS,
+                                         fsync_on_alarm=LOG_FSYNC_ON_ALARM, truncate=True)
+    context_log = BufferedCSVWriter(CONTEXT_FILE, CONTEXT_HEADER, flush_interval=LOG_FLUSH_INTERVAL,
+                                    flush_rows=LOG_FLUSH_ROWS, truncate=True)
+
+# Measurement history, rows older than MEASUREMENT_RETENTION are deleted
+measurement_store = MeasurementDatabase(MEASUREMENTS_DB_PATH, rules.sensors, retention=MEASUREMENT_RETENTION,
+                                        flush_interval=LOG_FLUSH_INTERVAL)
+
+# Per-minute and per-hour min, max, mean and count of every sensor, stored in the measurement database
+rollup_aggregator = RollupAggregator(rules.sensors)
+
+# Long-term columnar history, kept without a retention limit
+history_archive = ColumnarArchive(ARCHIVE_DIR, rules.sensors, flush_interval=LOG_FLUSH_INTERVAL)
+
+# Hand a write to the persist stage, or do it now when the pipeline is not running
+def persist(write, *args, **kwargs):
+    if persist_queue is None:
+        write(*args, **kwargs)
+    else:
+        persist_queue.put_nowait((write, args, kwargs))
+
+# Run a batch of queued writes, called on a worker thread so a slow disk never blocks the event loop
+def run_writes(batch):
+    for write, args, kwargs in batch:
+        try:
+            write(*args, **kwargs)
+        except Exception as e:
+            print(f"Error writing log row: {e}")
+
+# Stored with its status and out-of-range reasons, so context views can tell which readings were bad
+def save_measurement(m, reasons=None):
+    persist(measurement_store.write, m, reasons)
+    persist(history_archive.write, m)
+
+# Rollups of the minutes and hours the latest measurement completed
+def save_rollups(m):
+    rows = rollup_aggregator.update(m.node, m.timestamp, m)
+    if rows:
+        persist(measurement_store.write_rollups, rows)
 
 def save_out_of_range(measurement, reason, context):
-    with open(OUT_OF_RANGE_FILE, mode='a', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow([
-            safe_str(measurement.get("node")),
-            safe_str(measurement.get("temperature")),
-            safe_str(measurement.get("humidity")),
-            safe_str(measurement.get("ambient_light")),
-            safe_str(measurement.get("particle_count")),
-            safe_str(measurement.get("vibration")),
-            safe_str(measurement.get("time")),
-            safe_str(reason),
-            safe_str(context)
-        ])
-
-def save_context_data(measurement, context_type):
-    with open(CONTEXT_FILE, mode='a', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow([
-            safe_str(measurement.get("node")),
-            safe_str(measurement.get("temperature")),
-            safe_str(measurement.get("humidity")),
-            safe_str(measurement.get("ambient_light")),
-            safe_str(measurement.get("particle_count")),
-            safe_str(measurement.get("vibration")),
-            safe_str(measurement.get("time")),
-            safe_str(context_type)
-        ])
+    persist(out_of_range_log.write, measurement_row(measurement) + [safe_str(reason), safe_str(context)], alarm=True)
+
+# Record a finished excursion episode, its context is read back from the measurement store
+def save_context_data(episode):
+    persist(context_log.write, episode.row(CONTEXT_WINDOW))
+
+# Flush rows buffered by the writers even while no new measurements arrive
+def flush_logs_periodically():
+    while True:
+        time.sleep(LOG_FLUSH_INTERVAL)
+        # Episodes of nodes that stopped sending end here too. Written directly, the persist queue
+        # belongs to the event loop.
+        if context_log is not None:
+            for episode in expire_episodes():
+                context_log.write(episode.row(CONTEXT_WINDOW))
+        for log in (measurement_store, history_archive, out_of_range_log, context_log):
+            if log is not None:
+                log.poll()
+
+# Flush and close every log, runs at exit including after master-code sends SIGTERM
+def close_logs():
+    # The open minute and hour are stored as partial rollups, merged with the rest after a restart
+    if measurement_store is not None:
+        measurement_store.write_rollups(rollup_aggregator.drain())
+    # Episodes still open are recorded as they stand
+    if context_log is not None:
+        for episode in expire_episodes(float("inf")):
+            context_log.write(episode.row(CONTEXT_WINDOW))
+    for log in (measurement_store, history_archive, out_of_range_log, context_log):
+        if log is not None:
+            log.close()
 
 def wait_for_mqtt_connection():
     while True:
@@ -117,259 +227,268 @@ def wait_for_mqtt_connection():
             print("MQTT broker not available yet, waiting...")
             time.sleep(2)
 
-def publish_to_mqtt(topic, message):
-    command = [
-        "mosquitto_pub",
-        "-h", MQTT_BROKER,
-        "-p", str(MQTT_PORT),
-        "-u", MQTT_USERNAME,
-        "-P", MQTT_PASSWORD,
-        "-t", topic,
-        "-m", json.dumps(message)
-    ]
-    subprocess.run(command)
-
-def check_early_warning(measurement):
-    node_id = measurement.get("node", "Unknown")
-    node_measurements = [m for m in measurements_cache if m.get("node", "Unknown") == node_id]
-    if len(node_measurements) < 3:
-        return False
-    sorted_measurements = sorted(node_measurements, key=lambda m: datetime.fromisoformat(m['time']))
-    recent = sorted_measurements[-3:]
-    
-    acceptable_max = {
-        'temperature': acceptable_temp_range[1],
-        'humidity': acceptable_humid_range[1],
-        'ambient_light': acceptable_light_range[1],
-        'particle_count': acceptable_particle_range[1],
-        'vibration': VIBRATION_MAX
-    }
-    acceptable_min = {
-        'temperature': acceptable_temp_range[0],
-        'humidity': acceptable_humid_range[0],
-    }
-    warning_margins = {
-        'temperature': 2,
-        'humidity': 5,
-        'ambient_light': 2,
-        'particle_count': 10,
-        'vibration': 0.05
+# Single long-lived connection used for every published result
+# paho's own queue only needs room for the in-flight results plus metrics and the schema
+publisher = MQTTPublisher(MQTT_BROKER, MQTT_PORT, MQTT_USERNAME, MQTT_PASSWORD, client_id="analysis",
+                          max_inflight=PUBLISH_INFLIGHT, max_queued=2 * PUBLISH_INFLIGHT)
+
+# node is set for a single node's result, so a newer result only replaces an older one from the same node
+# (or, for whole-frame results, the older frame) while they wait in the publish queue
+def publish_to_mqtt(topic, message, node=None):
+    if publish_queue is None:
+        publisher.publish(topic, message)
+    else:
+        publish_queue.put_nowait((topic, message, node))
+
+# Units and display metadata of every sensor and node, retained so late subscribers get it on connect
+def results_schema():
+    return {
+        "version": SCHEMA_VERSION,
+        "sensors": {name: {"label": sensor.label, "unit": sensor.unit, "y_bounds": list(sensor.y_bounds)}
+                    for name, sensor in nodes.sensors.items()},
+        "nodes": {node.key: {"name": node.name, "title": node.title, "sensors": list(node.sensors)}
+                  for node in nodes},
     }
+
+def publish_schema():
+    publisher.publish(SCHEMA_TOPIC, results_schema(), retain=True)
+
+# v2 result of a measurement: readings as numbers (None when not numeric), its time and status
+def numeric_result(measurement):
+    result = measurement.to_dict()
+    result.pop("node", None)
+    for sensor in rules.sensors:
+        if sensor in result and not isinstance(result[sensor], (int, float)):
+            result[sensor] = None
+    return result
+
+# v1 result of a measurement, with every reading formatted as a string with its unit
+def formatted_result(measurement):
+    result = measurement.to_dict()
+    result.pop("node", None)
+    for sensor in rules.sensors:
+        value = result.get(sensor)
+        if value is None:
+            continue
+        unit = f" {rules.sensor_types[sensor].unit}"
+        if isinstance(value, (int, float)):
+            result[sensor] = f"{float(value)}{unit}"
+        elif not str(value).endswith(unit):
+            result[sensor] = f"{value}{unit}"
+    return result
+
+# checks is the RuleResults of the measurement's frame and row its row in them
+def check_early_warning(measurement, checks, row):
+    node_id = measurement.node
+    trends = trend_detector.update(node_id, measurement)
     
     triggered = False
-    for sensor in ['temperature', 'humidity', 'ambient_light', 'particle_count', 'vibration']:
-        if sensor not in recent[0] or sensor not in recent[1] or sensor not in recent[2]:
-            continue
-        if recent[0][sensor] < recent[1][sensor] < recent[2][sensor]:
-            if sensor in measurement and isinstance(measurement[sensor], (int, float)):
-                if measurement[sensor] >= acceptable_max[sensor] - warning_margins[sensor]:
-                    print(f"Early Warning: {sensor} reading for node {node_id} is increasing and nearing its bound. Current value: {measurement[sensor]}")
-                    triggered = True
-        if recent[0][sensor] > recent[1][sensor] > recent[2][sensor]:
-            if sensor in measurement and isinstance(measurement[sensor], (int, float)) and sensor in acceptable_min:
-                if measurement[sensor] <= acceptable_min[sensor] + warning_margins[sensor]:
-                    print(f"Early Warning: {sensor} reading for node {node_id} is decreasing and nearing its bound. Current value: {measurement[sensor]}")
-                    triggered = True
+    for j, sensor in enumerate(rules.sensors):
+        value = getattr(measurement, sensor, None)
+        if trends[sensor] == RISING and checks.near_high[row, j]:
+            print(f"Early Warning: {sensor} reading for node {node_id} is increasing and nearing its bound. Current value: {value}")
+            triggered = True
+        if trends[sensor] == FALLING and checks.near_low[row, j]:
+            print(f"Early Warning: {sensor} reading for node {node_id} is decreasing and nearing its bound. Current value: {value}")
+            triggered = True
     return triggered
 
-def analyze_and_process_node(measurement, publish=True):
-    global measurements_cache, fiveminbuff
-
-    # If no time is provided, assign current time.
-    if not measurement.get("time"):
-        measurement["time"] = datetime.now().isoformat()
-    measurements_cache.append(measurement)
-    cutoff_time = datetime.now() - timedelta(hours=5)
-    measurements_cache[:] = [m for m in measurements_cache if datetime.fromisoformat(m['time']) >= cutoff_time]
-    update_csv_file()
+# Warn about readings at the sensor's hardware limits
+def report_extremes(node_id, checks, row):
+    rule_row = checks.rows[row]
+    for flags, limits, direction in ((checks.above_extreme, rules.extreme_max, "above max"),
+                                     (checks.below_extreme, rules.extreme_min, "below min")):
+        for j in np.flatnonzero(flags[row]):
+            sensor = rules.sensor_types[rules.sensors[j]]
+            print(f"WARNING: {node_id} {sensor.label} {checks.values[row, j]:g} {sensor.unit} is at or {direction} "
+                  f"limit ({limits[rule_row, j]:g} {sensor.unit})!")
 
-    try:
-        current_time = datetime.fromisoformat(measurement["time"])
-    except Exception as e:
-        print(f"Error parsing time: {measurement.get('time')} Error: {e}")
-        return
+# checks may hold the rule results of the whole frame, otherwise the measurement is checked on its own
+def analyze_and_process_node(measurement, publish=True, checks=None, row=0):
+    # The timestamp was parsed once when the Measurement was built
+    node_id = measurement.node
+    current_timestamp = measurement.timestamp
 
-    node_id = measurement.get("node", "Unknown")
-    reasons = []
-    
-    temp = measurement.get("temperature")
-    if temp is not None:
-        if temp >= BME280_TEMP_MAX:
-            print(f"WARNING: {node_id} Temperature {temp}°C is at or above max limit ({BME280_TEMP_MAX}°C)!")
-        if temp <= BME280_TEMP_MIN:
-            print(f"WARNING: {node_id} Temperature {temp}°C is at or below min limit ({BME280_TEMP_MIN}°C)!")
-        if not (acceptable_temp_range[0] <= temp <= acceptable_temp_range[1]):
-            reasons.append("Temperature out of range")
-    
-    humid = measurement.get("humidity")
-    if humid is not None:
-        if humid >= HUMIDITY_MAX:
-            print(f"WARNING: {node_id} Humidity {humid}% is at or above max limit ({HUMIDITY_MAX}%)!")
-        if humid <= HUMIDITY_MIN:
-            print(f"WARNING: {node_id} Humidity {humid}% is at or below min limit ({HUMIDITY_MIN}%)!")
-        if not (acceptable_humid_range[0] <= humid <= acceptable_humid_range[1]):
-            reasons.append("Humidity out of range")
-    
-    light = measurement.get("ambient_light")
-    if light is not None:
-        if light >= VEML7700_MAX_LIGHT:
-            print(f"WARNING: {node_id} Ambient Light {light} is at or above the max limit ({VEML7700_MAX_LIGHT})")
-        if not (acceptable_light_range[0] <= light <= acceptable_light_range[1]):
-            reasons.append("Ambient light out of range")
+    if checks is None:
+        checks = rules.check([measurement])
+    report_extremes(node_id, checks, row)
     
-    particle = measurement.get("particle_count")
-    if particle is not None:
-        if particle >= IH_PMC_001_MAX:
-            print(f"WARNING: {node_id} Particle Count {particle} is at or above max limit ({IH_PMC_001_MAX})")
-        if not (acceptable_particle_range[0] <= particle <= acceptable_particle_range[1]):
-            reasons.append("Particle count out of range")
-    
-    vib = measurement.get("vibration")
-    if vib is not None:
-        try:
-            if not (VIBRATION_MIN <= float(vib) <= VIBRATION_MAX):
-                reasons.append("Vibration out of range")
-        except Exception as e:
-            reasons.append("Invalid vibration data")
+    reasons = []
+    for j, sensor in enumerate(rules.sensors):
+        name = sensor.replace("_", " ")
+        if checks.invalid[row, j]:
+            reasons.append(f"Invalid {name} data")
+        elif checks.out_of_range[row, j]:
+            reasons.append(f"{name.capitalize()} out of range")
     
     if reasons:
         print(f"WARNING: {node_id} measurement out of bounds! Issues: {', '.join(reasons)}")
         save_out_of_range(measurement, "; ".join(reasons), "Surrounding error readings")
-        for m in measurements_cache:
-            try:
-                if m.get("node") == node_id:
-                    t = datetime.fromisoformat(m["time"])
-                    if abs((t - current_time).total_seconds()) <= 300:
-                        context_type = "Exact moment" if m["time"] == measurement["time"] else "Surrounding Errors"
-                        save_context_data(m, context_type)
-            except Exception:
-                continue
-        fiveminbuff.append({
-            'error_time': current_time,
-            'deadline': current_time + timedelta(seconds=300),
-            'node': node_id
-        })
+        # Consecutive errors from a node extend one episode instead of copying its context again
+        with episodes_lock:
+            episode = open_episodes.get(node_id)
+            if episode is None:
+                open_episodes[node_id] = Episode(node_id, current_timestamp, measurement.time, reasons)
+            else:
+                episode.extend(current_timestamp, measurement.time, reasons)
+            fiveminbuff.add(node_id, current_timestamp + CONTEXT_WINDOW)
     
-    early_warning_flag = check_early_warning(measurement)
+    early_warning_flag = check_early_warning(measurement, checks, row)
     
     # NEW: Check for disconnected sensor values
-    if ((temp is not None and temp == -500) or
-        (humid is not None and humid == 150) or
-        (particle is not None and particle == 65535) or
-        (light is not None and light == -1000) or
-        (vib is not None and vib == -1)):
+    if checks.disconnected[row].any():
         print(f"INFO: {node_id} measurement marked as disconnected due to sensor readings.")
-        measurement["status"] = "Disconnected"
+        measurement.status = "Disconnected"
     elif reasons:
-        measurement["status"] = "Bad"
+        measurement.status = "Bad"
     elif early_warning_flag:
-        measurement["status"] = "Degraded"
+        measurement.status = "Degraded"
     else:
-        measurement["status"] = "Good"
+        measurement.status = "Good"
+    save_measurement(measurement, "; ".join(reasons) if reasons else None)
+    save_rollups(measurement)
     
-    for event in fiveminbuff.copy():
-        if event['node'] == node_id and event['error_time'] < current_time <= event['deadline']:
-            save_context_data(measurement, "Surrounding Errors (post)")
-        if current_time > event['deadline']:
-            fiveminbuff.remove(event)
-    
-    publish_measurement = measurement.copy()
-    sensor_units = {
-        "temperature": " °C",
-        "humidity": " %",
-        "ambient_light": " lux",
-        "particle_count": " μg/m\u00b3",
-        "vibration": " g"
-    }
-    for sensor, unit in sensor_units.items():
-        if sensor in publish_measurement and publish_measurement[sensor] is not None:
-            try:
-                numeric_value = float(publish_measurement[sensor])
-                publish_measurement[sensor] = f"{numeric_value}{unit}"
-            except Exception:
-                if not str(publish_measurement[sensor]).endswith(unit):
-                    publish_measurement[sensor] = f"{publish_measurement[sensor]}{unit}"
-    
-    # Remove the node information but keep the shared timestamp in the overall message.
-    publish_measurement.pop("node", None)
+    # An episode is over once the post-error window of its last error has passed
+    for episode in expire_episodes(current_timestamp):
+        save_context_data(episode)
     
+    # The node information is dropped but the measurement keeps its own timestamp
     if publish:
-        publish_to_mqtt(OUTPUT_TOPIC, publish_measurement)
+        publish_to_mqtt(RESULTS_TOPIC, numeric_result(measurement), node=node_id)
+        if PUBLISH_V1_RESULTS:
+            publish_to_mqtt(OUTPUT_TOPIC, formatted_result(measurement), node=node_id)
 
 # For combined messages, we use one overall timestamp and remove individual timestamps from sensor data.
-def process_node_data(node_data, node_name, overall_time, publish=True):
-    measurement = {"node": node_name, "time": overall_time}
-    if node_data.get("temperature") is not None:
-        measurement["temperature"] = node_data.get("temperature")
-    if node_data.get("humidity") is not None:
-        measurement["humidity"] = node_data.get("humidity")
-    if node_data.get("ambient_light") is not None:
-        measurement["ambient_light"] = node_data.get("ambient_light")
-    if node_data.get("particle_count") is not None:
-        measurement["particle_count"] = node_data.get("particle_count")
-    if node_data.get("vibration") is not None:
-        measurement["vibration"] = node_data.get("vibration")
-    
-    analyze_and_process_node(measurement, publish=publish)
-    
-    published_measurement = measurement.copy()
-    sensor_units = {
-        "temperature": " °C",
-        "humidity": " %",
-        "ambient_light": " lux",
-        "particle_count": " μg/m\u00b3",
-        "vibration": " g"
-    }
-    for sensor, unit in sensor_units.items():
-        if sensor in published_measurement and published_measurement[sensor] is not None:
-            try:
-                numeric_value = float(published_measurement[sensor])
-                published_measurement[sensor] = f"{numeric_value}{unit}"
-            except Exception:
-                if not str(published_measurement[sensor]).endswith(unit):
-                    published_measurement[sensor] = f"{published_measurement[sensor]}{unit}"
-    # Remove both "node" and "time" so that individual sensor data don't include a timestamp.
-    published_measurement.pop("node", None)
-    published_measurement.pop("time", None)
-    return published_measurement
-
-def listen_to_topic_combined(topic):
-    command = ["mosquitto_sub", "-h", MQTT_BROKER, "-p", str(MQTT_PORT), "-u", MQTT_USERNAME, "-P", MQTT_PASSWORD, "-t", topic]
+# Returns the node's v2 entry and, when PUBLISH_V1_RESULTS is set, its v1 entry (otherwise None).
+def process_node_data(measurement, publish=True, checks=None, row=0):
+    analyze_and_process_node(measurement, publish=publish, checks=checks, row=row)
+
+    result = numeric_result(measurement)
+    result.pop("time", None)
+    formatted = None
+    if PUBLISH_V1_RESULTS:
+        formatted = formatted_result(measurement)
+        formatted.pop("time", None)
+    return result, formatted
+
+# Analyze one message from the aggregator and queue its results
+def handle_message(line):
+    line = line.strip()
+    if not line:
+        return
     try:
-        with subprocess.Popen(command, stdout=subprocess.PIPE, text=True) as proc:
-            for line in proc.stdout:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    message = json.loads(line)
-                    # Direct measurement processing.
-                    if "node" in message:
-                        analyze_and_process_node(message)
-                    # For combined messages, extract one overall timestamp.
-                    elif all(k in message for k in ["PL_data", "SC_data", "SP_data"]):
-                        overall_time = message.get("time", datetime.now().isoformat())
-                        pl_measurement = process_node_data(message["PL_data"], "PL", overall_time, publish=False)
-                        sc_measurement = process_node_data(message["SC_data"], "SC", overall_time, publish=False)
-                        sp_measurement = process_node_data(message["SP_data"], "SP", overall_time, publish=False)
-                        combined_message = {
-                            "PL_data": pl_measurement,
-                            "SC_data": sc_measurement,
-                            "SP_data": sp_measurement,
-                            # Add one overall timestamp at the end.
-                            "time": overall_time
-                        }
-                        publish_to_mqtt(OUTPUT_TOPIC, combined_message)
-                    else:
-                        print(f"Incomplete data received on topic '{topic}': {line}")
-                except Exception as e:
-                    print(f"Error processing message: {line}, Error: {e}")
+        message = json.loads(line)
+        # Direct measurement processing.
+        if "node" in message:
+            analyze_and_process_node(Measurement.from_reading(message, sensors=rules.sensors))
+        # For combined messages, extract one overall timestamp.
+        elif all(node.key in message for node in nodes):
+            overall_time = message.get("time", datetime.now().isoformat())
+            # Nodes that missed the aggregator's frame deadline are reported as stale
+            stale = message.get("stale", [])
+            reporting = [node for node in nodes if node.key not in stale]
+            measurements = [Measurement.from_reading(message[node.key], node=node.name, time=overall_time,
+                                                     sensors=rules.sensors)
+                            for node in reporting]
+            # Every rule for every node in the frame is checked in one vectorized pass
+            checks = rules.check(measurements)
+            rows = {node.key: row for row, node in enumerate(reporting)}
+            combined_message = {}
+            formatted_message = {}
+            for node in nodes:
+                if node.key in stale:
+                    combined_message[node.key] = formatted_message[node.key] = {"status": "Stale"}
+                else:
+                    row = rows[node.key]
+                    combined_message[node.key], formatted_message[node.key] = process_node_data(
+                        measurements[row], publish=False, checks=checks, row=row)
+            # Add one overall timestamp at the end.
+            combined_message["time"] = formatted_message["time"] = overall_time
+            publish_to_mqtt(RESULTS_TOPIC, combined_message)
+            if PUBLISH_V1_RESULTS:
+                publish_to_mqtt(OUTPUT_TOPIC, formatted_message)
+        else:
+            print(f"Incomplete data received on topic '{INPUT_TOPIC}': {line}")
     except Exception as e:
-        print(f"Error in listening to topic {topic}: {e}")
+        print(f"Error processing message: {line}, Error: {e}")
+
+async def analyze_stage():
+    while True:
+        handle_message(await ingest_queue.get())
+        # Backpressure: don't analyze more while the disk is behind
+        await persist_queue.wait_for_space()
+        # Let the persist and publish stages run between messages
+        await asyncio.sleep(0)
+
+async def persist_stage():
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await persist_queue.get()] + persist_queue.drain()
+        await loop.run_in_executor(None, run_writes, batch)
+
+async def publish_stage():
+    inflight = deque()
+    while True:
+        try:
+            while inflight and publish_done(inflight[0]):
+                inflight.popleft()
+            if not publisher.connected.is_set() or len(inflight) >= PUBLISH_INFLIGHT:
+                await asyncio.sleep(PUBLISH_POLL_INTERVAL)
+                continue
+            topic, message, _ = await publish_queue.get()
+            inflight.append(publisher.publish(topic, message))
+        except Exception as e:
+            # One failed publish must not stop every later result from being published
+            print(f"Error publishing result: {e}")
+            inflight.clear()
+
+# Publish the depth and drop counts of every queue, and warn when messages were dropped
+async def report_metrics():
+    queues = (ingest_queue, persist_queue, publish_queue)
+    dropped = 0
+    while True:
+        await asyncio.sleep(METRICS_INTERVAL)
+        metrics = {queue.name: queue.stats() for queue in queues}
+        metrics["time"] = datetime.now().replace(microsecond=0).isoformat()
+        publisher.publish(METRICS_TOPIC, metrics)
+        total_dropped = sum(queue.dropped for queue in queues)
+        if total_dropped > dropped:
+            print(f"WARNING: analysis is overloaded, {total_dropped - dropped} queued messages dropped in the last {METRICS_INTERVAL}s")
+            dropped = total_dropped
+
+async def run_pipeline():
+    global ingest_queue, persist_queue, publish_queue
+    ingest_queue = StageQueue("ingest", INGEST_QUEUE_SIZE, DROP_OLDEST)
+    persist_queue = StageQueue("persist", PERSIST_QUEUE_SIZE, BLOCK)
+    publish_queue = StageQueue("publish", PUBLISH_QUEUE_SIZE, COALESCE, key=lambda item: (item[0], item[2]))
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    # Ingest: messages arrive on the MQTT network thread and are handed to the event loop
+    subscriber = MQTTSubscriber(MQTT_BROKER, MQTT_PORT, MQTT_USERNAME, MQTT_PASSWORD, client_id="analysis-sub",
+                                topics=[INPUT_TOPIC])
+    subscriber.add_handler(INPUT_TOPIC, lambda payload: loop.call_soon_threadsafe(ingest_queue.put_nowait, payload))
+    subscriber.start()
+
+    stages = [asyncio.create_task(stage()) for stage in (analyze_stage, persist_stage, publish_stage, report_metrics)]
+    await stop.wait()
+
+    subscriber.stop()
+    for stage in stages:
+        stage.cancel()
+    await asyncio.gather(*stages, return_exceptions=True)
+    # Write out anything still waiting for the disk before the logs are closed
+    run_writes(persist_queue.drain())
 
 initialize_csv()
+atexit.register(close_logs)
+Thread(target=flush_logs_periodically, daemon=True).start()
 wait_for_mqtt_connection()
+publisher.start()
+publish_schema()
 
-combined_thread = Thread(target=listen_to_topic_combined, args=(INPUT_TOPIC,), daemon=True)
-combined_thread.start()
-combined_thread.join()
+asyncio.run(run_pipeline())
+publisher.stop()